@@ -0,0 +1,254 @@
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from app.auth import verify_token
+from app.database import pool_metrics
+
+# Per-client token bucket: sustained requests per second and burst size.
+# A client is its bearer token if it sends a valid one, otherwise its IP
+# address.
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+# Buckets kept per worker; the least recently seen client is dropped first
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Take the client IP from X-Forwarded-For; only safe behind a proxy that sets it
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+# Requests in flight per route, e.g. "GET /tests". Overrides are
+# comma-separated "METHOD /prefix=limit" pairs. 0 means no limit.
+ROUTE_CONCURRENCY_LIMIT = int(os.getenv("ROUTE_CONCURRENCY_LIMIT", "32"))
+ROUTE_CONCURRENCY_LIMITS = os.getenv("ROUTE_CONCURRENCY_LIMITS", "")
+# Shed requests while this many threads are waiting for a pooled connection.
+# 0 disables shedding.
+ADMISSION_MAX_POOL_WAITERS = int(os.getenv("ADMISSION_MAX_POOL_WAITERS", "20"))
+
+# Monitoring stays reachable when everything else is being refused
+EXEMPT_PREFIXES = ("/internal", "/metrics", "/docs", "/redoc", "/openapi.json")
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+# Route key of requests to paths no router serves, or with an unusual method
+OTHER_ROUTE = "other"
+
+
+def parse_route_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        route, _, limit = item.rpartition("=")
+        limits[" ".join(route.split())] = int(limit)
+    return limits
+
+
+def route_segment(path: str) -> str:
+    return path.lstrip("/").split("/", 1)[0]
+
+
+def route_key(method: str, path: str, segments: FrozenSet[str]) -> str:
+    """
+    Group a request by its method and first path segment, so /tests/ and
+    /tests/5 share the "GET /tests" limit. The middleware runs before
+    routing, so the matched route template is not known yet. Segments no
+    route starts with share one key, or any made-up path would add a
+    counter and a metric series of its own.
+    """
+    segment = route_segment(path)
+    if method not in METHODS or segment not in segments:
+        return OTHER_ROUTE
+    return f"{method} /{segment}"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class AdmissionController:
+    """
+    Decides whether a request is admitted, and counts every decision.
+
+    Checks run in order: database pool backlog (503), per-client token
+    bucket (429), per-route concurrency cap (503). Refusals carry a
+    Retry-After. State is per worker and only touched from the event loop,
+    so it needs no locking.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int,
+        route_limit: int,
+        route_limits: Dict[str, int],
+        max_pool_waiters: int,
+        trust_proxy: bool = False,
+        segments: Iterable[str] = (),
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.route_limit = route_limit
+        self.route_limits = route_limits
+        self.max_pool_waiters = max_pool_waiters
+        self.trust_proxy = trust_proxy
+        # First path segments of the app's routes, see set_routes()
+        self.segments: FrozenSet[str] = frozenset(segments)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.admitted = 0
+        self.rate_limited = 0
+        self.concurrency_limited = 0
+        self.shed = 0
+        # route -> {"admitted": n, "rate_limited": n, ...}
+        self.by_route: Dict[str, Dict[str, int]] = {}
+
+    def set_routes(self, paths: Iterable[str]) -> None:
+        """Route requests by the first segments of these path templates."""
+        self.segments = frozenset(route_segment(path) for path in paths)
+
+    def client_key(self, scope) -> str:
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"")
+        if authorization[:7].lower() == b"bearer ":
+            token = authorization[7:].strip()
+            # Only a verified token gets a bucket of its own; otherwise any
+            # client could dodge its IP's bucket, or push real clients out of
+            # the LRU, by sending a new made-up token with every request
+            if verify_token(token.decode("latin-1")) is not None:
+                return "token:" + hashlib.blake2b(token, digest_size=12).hexdigest()
+        if self.trust_proxy and b"x-forwarded-for" in headers:
+            return "ip:" + headers[b"x-forwarded-for"].split(b",", 1)[0].strip().decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    def limit_for(self, route: str) -> int:
+        return self.route_limits.get(route, self.route_limit)
+
+    def take_token(self, client: str, now: float) -> float:
+        """Spend one token of `client`'s bucket. Returns 0, or seconds until one is available."""
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, now)
+            self._buckets[client] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+    def admit(self, scope) -> Optional[Tuple[int, str, int]]:
+        """
+        None if the request may proceed, holding a concurrency slot that
+        must be handed back with release(). Otherwise (status, detail,
+        retry_after).
+        """
+        route = route_key(scope["method"], scope["path"], self.segments)
+        if self.max_pool_waiters and pool_metrics.waiting >= self.max_pool_waiters:
+            self._count(route, "shed")
+            return 503, "Server is overloaded, try again later", 1
+
+        if self.rate > 0:
+            wait = self.take_token(self.client_key(scope), time.monotonic())
+            if wait:
+                self._count(route, "rate_limited")
+                return 429, "Too many requests", max(1, math.ceil(wait))
+
+        limit = self.limit_for(route)
+        in_flight = self._in_flight.get(route, 0)
+        if limit and in_flight >= limit:
+            self._count(route, "concurrency_limited")
+            return 503, "Too many concurrent requests for this endpoint", 1
+
+        self._in_flight[route] = in_flight + 1
+        self._count(route, "admitted")
+        return None
+
+    def release(self, scope) -> None:
+        route = route_key(scope["method"], scope["path"], self.segments)
+        self._in_flight[route] -= 1
+
+    def _count(self, route: str, decision: str) -> None:
+        setattr(self, decision, getattr(self, decision) + 1)
+        counts = self.by_route.get(route)
+        if counts is None:
+            counts = self.by_route[route] = {
+                "admitted": 0, "rate_limited": 0, "concurrency_limited": 0, "shed": 0,
+            }
+        counts[decision] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "max_clients": self.max_clients,
+            "route_limit": self.route_limit,
+            "route_limits": self.route_limits,
+            "max_pool_waiters": self.max_pool_waiters,
+            "pool_waiting": pool_metrics.waiting,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "concurrency_limited": self.concurrency_limited,
+            "shed": self.shed,
+            "in_flight": {route: n for route, n in self._in_flight.items() if n},
+            "routes": self.by_route,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that refuses requests the AdmissionController turns down."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        refusal = self.controller.admit(scope)
+        if refusal is not None:
+            status_code, detail, retry_after = refusal
+            body = json.dumps({"detail": detail}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(scope)
+
+
+admission_controller = AdmissionController(
+    rate=RATE_LIMIT_RPS,
+    burst=RATE_LIMIT_BURST,
+    max_clients=RATE_LIMIT_MAX_CLIENTS,
+    route_limit=ROUTE_CONCURRENCY_LIMIT,
+    route_limits=parse_route_limits(ROUTE_CONCURRENCY_LIMITS),
+    max_pool_waiters=ADMISSION_MAX_POOL_WAITERS,
+    trust_proxy=RATE_LIMIT_TRUST_PROXY,
+)
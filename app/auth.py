@@ -1,5 +1,10 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from threading import Lock
+from typing import Any, Dict, Optional
+import hashlib
+import time
+import uuid
 import jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
@@ -9,14 +14,32 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from app.services.revocation import revocation_store
+
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 ADMIN_PASS_KEY = os.getenv("ADMIN_PASS_KEY", "admin123")
+# Keys that signed tokens still in circulation, comma-separated. After
+# changing SECRET_KEY, keep the old one here until its tokens have expired.
+PREVIOUS_SECRET_KEYS = [key for key in os.getenv("PREVIOUS_SECRET_KEYS", "").split(",") if key]
+# Verified tokens kept per worker, so repeat requests skip the signature check
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+
+def _key_id(key: str) -> str:
+    return hashlib.sha256(b"kid:" + key.encode()).hexdigest()[:16]
+
+
+# Tokens name their key in the `kid` header; the first key signs new tokens
+SIGNING_KEYS = {_key_id(key): key for key in [SECRET_KEY, *PREVIOUS_SECRET_KEYS]}
+SIGNING_KEY_ID = _key_id(SECRET_KEY)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+# For endpoints that also serve anonymous callers
+optional_security = HTTPBearer(auto_error=False)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -25,17 +48,125 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM, headers={"kid": SIGNING_KEY_ID})
     return encoded_jwt
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of tokens whose signature has been checked.
+
+    An entry holds the decoded claims and is dropped once the token's `exp`
+    has passed, so a cached token is never accepted for longer than
+    jwt.decode would accept it. Revocation is checked separately on every
+    request, cached or not.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._entries.get(token)
+            if payload is None:
+                self.misses += 1
+                return None
+            if payload["exp"] <= time.time():
+                del self._entries[token]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return payload
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[token] = payload
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+            }
+
+
+token_cache = TokenCache(AUTH_TOKEN_CACHE_SIZE)
+
+
+def _decode(token: str) -> Optional[Dict[str, Any]]:
+    # Almost every token is signed with the current key, so try that before
+    # parsing the header a second time to look for another one
+    key = SECRET_KEY
+    fallbacks = None
+    while True:
+        try:
+            payload = jwt.decode(token, key, algorithms=[ALGORITHM])
+            # The cache needs an expiry to know when to drop the token
+            return payload if "exp" in payload else None
+        except jwt.InvalidSignatureError:
+            if fallbacks is None:
+                kid = jwt.get_unverified_header(token).get("kid")
+                if kid is None:
+                    # Issued before tokens carried a key id
+                    fallbacks = list(PREVIOUS_SECRET_KEYS)
+                elif kid != SIGNING_KEY_ID and kid in SIGNING_KEYS:
+                    fallbacks = [SIGNING_KEYS[kid]]
+                else:
+                    fallbacks = []
+            if not fallbacks:
+                return None
+            key = fallbacks.pop(0)
+        except jwt.PyJWTError:
+            return None
+
+
+def token_id(token: str, payload: Dict[str, Any]) -> str:
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
 def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.PyJWTError:
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = _decode(token)
+        if payload is None:
+            return None
+        token_cache.put(token, payload)
+    if revocation_store.is_revoked(token_id(token, payload)):
         return None
+    return payload
+
+
+def revoke_token(token: str) -> bool:
+    """
+    Refuse `token` from now on. Other workers pick the revocation up within
+    TOKEN_REVOCATION_REFRESH seconds. False if the token was already invalid.
+    """
+    payload = verify_token(token)
+    if payload is None:
+        return False
+    revocation_store.revoke(token_id(token, payload), payload["exp"])
+    token_cache.discard(token)
+    return True
 
 
 def authenticate_admin(pass_key: str) -> bool:
@@ -59,4 +190,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user_role != "admin":
         raise credentials_exception
     
-    return {"role": user_role}
\ No newline at end of file
+    return {"role": user_role}
+
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> Optional[dict]:
+    """The user of the request's token, or None without one. A bad token is still refused."""
+    if credentials is None:
+        return None
+    return await get_current_user(credentials)
\ No newline at end of file
@@ -0,0 +1,35 @@
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix is ignored
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def conditional_response(
+    request: Request,
+    body: bytes,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    JSON response carrying a strong ETag, or 304 Not Modified when the
+    client's If-None-Match already names it.
+    """
+    etag = etag or compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,32 +1,91 @@
+from contextlib import asynccontextmanager
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
-from app.routers import auth, tests, listening, reading, speaking, writing, upload
+from app.admission import AdmissionMiddleware, admission_controller
+from app.database import configure_threadpool, dispose_engine
+from app.metrics import MetricsMiddleware
+from app.profiling import ProfilingMiddleware
+from app.query_log import QUERY_LOG_ENABLED, QueryLogMiddleware
+from app.services.attempts import attempt_writer
+from app.services.grading import shutdown_grading_pool
+from app.services.images import shutdown_image_pool
+from app.services.media import media_cache
+from app.services.resumable import resumable_uploads
+from app.services.revocation import revocation_store
+from app.services.upload import upload_service
+from app.routers import auth, tests, listening, reading, speaking, writing, upload, internal, attempts, search, media, bulk, metrics
+
+logger = logging.getLogger(__name__)
+
+# Importing this module opens no connections: the schema is managed with
+# `alembic upgrade head`, the database engine connects on the first query
+# and the storage client on the first upload.
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_threadpool()
+    if not upload_service.storage.is_configured:
+        logger.warning("SUPABASE_ANON_KEY not set. Upload functionality will be limited.")
+    media_cache.load()
+    attempt_writer.start()
+    resumable_uploads.start()
+    revocation_store.start()
+    yield
+    await revocation_store.stop()
+    await resumable_uploads.stop()
+    shutdown_grading_pool()
+    shutdown_image_pool()
+    attempt_writer.stop()
+    await upload_service.storage.close()
+    dispose_engine()
 
-# Create tables with new schema
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="IELTS App API",
     description="API for IELTS Reading, Writing, Listening, and Speaking practice",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Innermost, so a profile covers the request handling and little else
+app.add_middleware(ProfilingMiddleware)
+if QUERY_LOG_ENABLED:
+    app.add_middleware(QueryLogMiddleware)
+# Inside admission control, so it only times requests that were admitted;
+# refusals are counted by the admission controller
+app.add_middleware(MetricsMiddleware)
+# Added before CORS so that CORS wraps it and 429/503 responses carry CORS headers
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-After-Id", "Upload-Offset", "Retry-After", "X-Profile-Id"],
 )
 
-app.include_router(auth.router)
-app.include_router(tests.router)
-app.include_router(listening.router)
-app.include_router(reading.router)
-app.include_router(speaking.router)
-app.include_router(writing.router)
-app.include_router(upload.router)
+ROUTERS = (
+    auth.router,
+    tests.router,
+    listening.router,
+    reading.router,
+    speaking.router,
+    writing.router,
+    upload.router,
+    attempts.router,
+    search.router,
+    bulk.router,
+    media.router,
+    internal.router,
+    metrics.router,
+)
+for router in ROUTERS:
+    app.include_router(router)
+# Admission control runs before routing and groups requests by these
+admission_controller.set_routes(route.path for router in ROUTERS for route in router.routes)
 
 @app.get("/")
 def root():
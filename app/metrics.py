@@ -0,0 +1,290 @@
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.admission import admission_controller
+from app.database import engine, pool_metrics
+from app.profiling import record_timing
+from app.services.cache import content_cache
+
+# Bearer token Prometheus must send to read /metrics. Empty leaves it open.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Upper bounds of the histogram buckets
+REQUEST_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+UPLOAD_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Label values of db_query_seconds; anything else is counted as "OTHER"
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+# Route label of requests no route matched, so scanners cannot blow up
+# the number of series
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Prometheus histogram. Observations only bump one bucket, the count and
+    the sum; buckets are made cumulative when rendered.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for label_values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge or counter whose values are read from `collect` when /metrics is
+    scraped, for numbers other components already keep.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+        labels: Tuple[str, ...] = (),
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labels = labels
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in self.collect():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+http_requests = Counter(
+    "ieltsly_http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"),
+)
+http_request_seconds = Histogram(
+    "ieltsly_http_request_duration_seconds", "Time from receiving a request to sending the last byte.",
+    REQUEST_SECONDS_BUCKETS, ("method", "route"),
+)
+http_request_queries = Histogram(
+    "ieltsly_http_request_db_queries", "SQL statements executed per request.",
+    QUERIES_PER_REQUEST_BUCKETS, ("method", "route"),
+)
+http_request_db_seconds = Histogram(
+    "ieltsly_http_request_db_seconds", "Time spent executing SQL per request.",
+    REQUEST_SECONDS_BUCKETS, ("method", "route"),
+)
+db_query_seconds = Histogram(
+    "ieltsly_db_query_duration_seconds", "Execution time of single SQL statements.",
+    QUERY_SECONDS_BUCKETS, ("operation",),
+)
+storage_upload_seconds = Histogram(
+    "ieltsly_storage_upload_duration_seconds", "Time to put one object in storage.",
+    UPLOAD_SECONDS_BUCKETS, ("backend", "outcome"),
+)
+storage_upload_bytes = Counter(
+    "ieltsly_storage_upload_bytes_total", "Bytes put in storage.", ("backend",),
+)
+
+
+def _pool_connections():
+    pool = engine.pool
+    return [(("checked_out",), pool.checkedout()), (("idle",), pool.checkedin())]
+
+
+def _admission_decisions():
+    for route, counts in sorted(admission_controller.by_route.items()):
+        for decision, count in counts.items():
+            yield (route, decision), count
+
+
+def _content_cache_counters():
+    stats = content_cache.stats()
+    for outcome in ("hits", "misses", "evictions", "expirations", "invalidations", "stale_puts"):
+        yield (outcome,), stats[outcome]
+
+
+REGISTRY = [
+    http_requests,
+    http_request_seconds,
+    http_request_queries,
+    http_request_db_seconds,
+    db_query_seconds,
+    CallbackMetric("ieltsly_db_pool_connections", "Pooled connections by state.", _pool_connections, ("state",)),
+    CallbackMetric(
+        "ieltsly_db_pool_waiting", "Requests waiting for a pooled connection.",
+        lambda: [((), pool_metrics.waiting)],
+    ),
+    CallbackMetric(
+        "ieltsly_db_pool_timeouts_total", "Checkouts that gave up waiting for a connection.",
+        lambda: [((), pool_metrics.timeouts)], kind="counter",
+    ),
+    storage_upload_seconds,
+    storage_upload_bytes,
+    CallbackMetric(
+        "ieltsly_admission_decisions_total", "Admission decisions by route.",
+        _admission_decisions, ("route", "decision"), kind="counter",
+    ),
+    CallbackMetric(
+        "ieltsly_content_cache_events_total", "Test content cache lookups and removals.",
+        _content_cache_counters, ("event",), kind="counter",
+    ),
+]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+# Set for the duration of each request. Handlers running in the thread pool
+# get a copy of the context, so they add to the same object.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    operation = (statement.split(None, 1) or [""])[0].upper()
+    db_query_seconds.observe(elapsed, operation if operation in QUERY_OPERATIONS else "OTHER")
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+    record_timing("database", elapsed)
+
+
+@event.listens_for(engine, "handle_error")
+def _handle_error(exception_context):
+    # after_cursor_execute is not called for a failed statement
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each request under the path template of the
+    route that handled it, e.g. "/tests/{test_id}".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_requests.inc(method, path, str(status_code))
+            http_request_seconds.observe(elapsed, method, path)
+            http_request_queries.observe(stats.queries, method, path)
+            http_request_db_seconds.observe(stats.query_seconds, method, path)
+
+
+def record_upload(backend: str, outcome: str, seconds: float, size: int) -> None:
+    storage_upload_seconds.observe(seconds, backend, outcome)
+    if outcome == "ok":
+        storage_upload_bytes.inc(backend, amount=size)
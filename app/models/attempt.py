@@ -0,0 +1,57 @@
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, Optional
+from app.database import Base
+
+
+class Attempt(Base):
+    __tablename__ = "ielts_attempts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Attempts go with their test, or the test could never be deleted
+    test_id = Column(Integer, ForeignKey("ielts_tests.id", ondelete="CASCADE"), nullable=False, index=True)
+    # "reading" or "listening"
+    section = Column(String, nullable=False)
+    section_id = Column(Integer, nullable=False)
+    student_id = Column(String, nullable=False, index=True)
+    # Example: {1: {1: "A", 2: "TRUE"}, 2: {1: "London"}}
+    answers = Column(JSON, nullable=False)
+    correct = Column(Integer, nullable=False)
+    total = Column(Integer, nullable=False)
+    band = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Pydantic Schemas
+class AttemptResponse(BaseModel):
+    id: int
+    test_id: int
+    section: str
+    section_id: int
+    student_id: str
+    answers: Dict[int, Dict[int, str]]
+    correct: int
+    total: int
+    band: float
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+# Partial rows returned by list endpoints when `fields=` is used
+class AttemptListItem(BaseModel):
+    id: int
+    test_id: Optional[int] = None
+    section: Optional[str] = None
+    section_id: Optional[int] = None
+    student_id: Optional[str] = None
+    answers: Optional[Dict[int, Dict[int, str]]] = None
+    correct: Optional[int] = None
+    total: Optional[int] = None
+    band: Optional[float] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,53 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from app.models.listening import ListeningAdminResponse
+from app.models.reading import ReadingAdminResponse
+from app.models.speaking import SpeakingResponse
+from app.models.test import TestCreate, TestResponse
+from app.models.writing import WritingResponse
+
+
+# A complete test for bulk import. Sections are validated with their own
+# *Create schemas once the test id is known, so they need no test_id here.
+class TestImport(TestCreate):
+    listening: Optional[Dict[str, Any]] = None
+    reading: Optional[Dict[str, Any]] = None
+    speaking: Optional[Dict[str, Any]] = None
+    writing: Optional[Dict[str, Any]] = None
+    # Further rows of a section, e.g. {"speaking": [{...}]}, as exported
+    extra_sections: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+
+class ImportRecordError(BaseModel):
+    # Position of the record in the uploaded stream, starting at 0
+    index: int
+    title: Optional[str] = None
+    errors: List[str]
+
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    test_ids: List[int]
+    errors: List[ImportRecordError]
+
+
+# Section rows of a test after the first one of each kind
+class ExtraSectionsExport(BaseModel):
+    listening: List[ListeningAdminResponse] = []
+    reading: List[ReadingAdminResponse] = []
+    speaking: List[SpeakingResponse] = []
+    writing: List[WritingResponse] = []
+
+
+# One line of the export. Answer keys are included, and the shape is
+# accepted back by the import, which ignores the ids. Each section is the
+# one with the lowest id, as served by GET /{section}/test/{test_id}; any
+# further rows are in `extra_sections`.
+class TestExport(TestResponse):
+    listening: Optional[ListeningAdminResponse] = None
+    reading: Optional[ReadingAdminResponse] = None
+    speaking: Optional[SpeakingResponse] = None
+    writing: Optional[WritingResponse] = None
+    extra_sections: Optional[ExtraSectionsExport] = None
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+MAX_BATCH_SUBMISSIONS = 10000
+
+
+# Schemas for grading Reading and Listening answers
+class GradeRequest(BaseModel):
+    # When set, the result is stored as an attempt for this student
+    student_id: Optional[str] = None
+    # Part number (1-4) -> question number -> answer
+    # Example: {1: {1: "A", 2: "true", 3: "climate change"}, 2: {1: "C"}}
+    answers: Dict[int, Dict[int, str]]
+
+
+class PartResult(BaseModel):
+    part: int
+    correct: int
+    total: int
+    results: Dict[int, bool]
+
+
+class GradeResponse(BaseModel):
+    correct: int
+    total: int
+    band: float
+    parts: List[PartResult]
+
+
+
+class BatchSubmission(BaseModel):
+    # When set, the result is stored as an attempt for this student
+    student_id: Optional[str] = None
+    answers: Dict[int, Dict[int, str]]
+
+
+class BatchGradeRequest(BaseModel):
+    submissions: List[BatchSubmission] = Field(..., max_length=MAX_BATCH_SUBMISSIONS)
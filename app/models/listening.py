@@ -74,10 +74,31 @@ class ListeningResponse(BaseModel):
     audio_url2: str
     audio_url3: str
     audio_url4: str
+    
+    class Config:
+        from_attributes = True
+
+
+# Includes the answer keys, so only returned to admins
+class ListeningAdminResponse(ListeningResponse):
     answer_sheet1: Dict[int, str]
     answer_sheet2: Dict[int, str]
     answer_sheet3: Dict[int, str]
     answer_sheet4: Dict[int, str]
+
+
+# Partial rows returned by list endpoints when `fields=` is used
+class ListeningListItem(BaseModel):
+    id: int
+    test_id: Optional[int] = None
+    text1: Optional[str] = None
+    text2: Optional[str] = None
+    text3: Optional[str] = None
+    text4: Optional[str] = None
+    audio_url1: Optional[str] = None
+    audio_url2: Optional[str] = None
+    audio_url3: Optional[str] = None
+    audio_url4: Optional[str] = None
     
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -58,10 +58,27 @@ class ReadingResponse(BaseModel):
     text2: str
     text3: str
     text4: str
+    
+    class Config:
+        from_attributes = True
+
+
+# Includes the answer keys, so only returned to admins
+class ReadingAdminResponse(ReadingResponse):
     answer_sheet1: Dict[int, str]
     answer_sheet2: Dict[int, str]
     answer_sheet3: Dict[int, str]
     answer_sheet4: Dict[int, str]
+
+
+# Partial rows returned by list endpoints when `fields=` is used
+class ReadingListItem(BaseModel):
+    id: int
+    test_id: Optional[int] = None
+    text1: Optional[str] = None
+    text2: Optional[str] = None
+    text3: Optional[str] = None
+    text4: Optional[str] = None
     
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List
+
+
+# Schemas for full-text search
+class SearchHit(BaseModel):
+    # "reading", "listening" or "writing"
+    section: str
+    id: int
+    test_id: int
+    rank: float
+    # Matching excerpt with the search terms wrapped in <mark></mark>
+    snippet: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    results: List[SearchHit]
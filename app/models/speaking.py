@@ -36,5 +36,16 @@ class SpeakingResponse(BaseModel):
     questions: List[str]
     instruction_ai: str
     
+    class Config:
+        from_attributes = True
+
+
+# Partial rows returned by list endpoints when `fields=` is used
+class SpeakingListItem(BaseModel):
+    id: int
+    test_id: Optional[int] = None
+    questions: Optional[List[str]] = None
+    instruction_ai: Optional[str] = None
+    
     class Config:
         from_attributes = True
\ No newline at end of file
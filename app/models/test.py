@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, JSON
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from app.database import Base
+from app.models.listening import ListeningResponse
+from app.models.reading import ReadingResponse
+from app.models.speaking import SpeakingResponse
+from app.models.writing import WritingResponse
 
 
 class Test(Base):
@@ -11,6 +15,8 @@ class Test(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     image = Column(String, nullable=True)
+    # URLs of the resized copies of `image`, filled in by the API
+    image_variants = Column(JSON, nullable=True)
     description = Column(Text, nullable=False)
     
     # Relationships
@@ -37,7 +43,27 @@ class TestResponse(BaseModel):
     id: int
     title: str
     image: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     description: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Partial rows returned by list endpoints when `fields=` is used
+class TestListItem(BaseModel):
+    id: int
+    title: Optional[str] = None
+    image: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
+    description: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class TestFullResponse(TestResponse):
+    listening: Optional[ListeningResponse] = None
+    reading: Optional[ReadingResponse] = None
+    speaking: Optional[SpeakingResponse] = None
+    writing: Optional[WritingResponse] = None
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime
+from pydantic import BaseModel
+from datetime import datetime
+from app.database import Base
+
+
+class RevokedToken(Base):
+    __tablename__ = "ielts_revoked_tokens"
+
+    # The token's `jti` claim, or the SHA-256 of tokens issued without one
+    jti = Column(String, primary_key=True)
+    # Rows can be dropped once the token would have expired anyway
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Pydantic Schemas
+class TokenRevoke(BaseModel):
+    token: str
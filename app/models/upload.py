@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+    content_type: str
+
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    filename: str
+    content_type: str
+    size: int
+    offset: int
+    expires_at: Optional[float] = None
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, JSON, ForeignKey
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from app.database import Base
 
 
@@ -14,6 +14,9 @@ class Writing(Base):
     task_2_text = Column(Text, nullable=False)
     task_1_image_url = Column(String, nullable=True)
     task_2_image_url = Column(String, nullable=True)
+    # URLs of the resized copies of the task images, filled in by the API
+    task_1_image_variants = Column(JSON, nullable=True)
+    task_2_image_variants = Column(JSON, nullable=True)
     task_1_instruction = Column(Text, nullable=False)
     task_2_instruction = Column(Text, nullable=False)
     task_1_ai_prompt = Column(Text, nullable=False)
@@ -54,10 +57,31 @@ class WritingResponse(BaseModel):
     task_2_text: str
     task_1_image_url: Optional[str] = None
     task_2_image_url: Optional[str] = None
+    task_1_image_variants: Optional[Dict[str, Dict[str, str]]] = None
+    task_2_image_variants: Optional[Dict[str, Dict[str, str]]] = None
     task_1_instruction: str
     task_2_instruction: str
     task_1_ai_prompt: str
     task_2_ai_prompt: str
     
+    class Config:
+        from_attributes = True
+
+
+# Partial rows returned by list endpoints when `fields=` is used
+class WritingListItem(BaseModel):
+    id: int
+    test_id: Optional[int] = None
+    task_1_text: Optional[str] = None
+    task_2_text: Optional[str] = None
+    task_1_image_url: Optional[str] = None
+    task_2_image_url: Optional[str] = None
+    task_1_image_variants: Optional[Dict[str, Dict[str, str]]] = None
+    task_2_image_variants: Optional[Dict[str, Dict[str, str]]] = None
+    task_1_instruction: Optional[str] = None
+    task_2_instruction: Optional[str] = None
+    task_1_ai_prompt: Optional[str] = None
+    task_2_ai_prompt: Optional[str] = None
+    
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from fastapi import HTTPException, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence
+
+from app.etag import conditional_response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(model, schema, fields: Optional[str]):
+    """
+    Columns to select for `fields=id,test_id`. `id` is always included, and
+    only fields of the public `schema` may be requested.
+    """
+    allowed = [name for name in schema.model_fields if name in model.__table__.columns]
+    if not fields:
+        return [getattr(model, name) for name in allowed]
+
+    names = ["id"] + [name.strip() for name in fields.split(",") if name.strip() and name.strip() != "id"]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    return [getattr(model, name) for name in dict.fromkeys(names)]
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def keyset_page(
+    db: Session,
+    model,
+    schema,
+    request: Request,
+    after_id: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    filters: Sequence = (),
+) -> Response:
+    """
+    One page of `model` ordered by id, starting after `after_id`, serialized
+    with `schema` and sent with an ETag.
+
+    Only the columns in `schema`, or the subset named in `fields`, are
+    selected, and `filters` narrows the rows. When the page is full the id
+    to continue from is sent in `X-Next-After-Id`.
+    """
+    columns = parse_fields(model, schema, fields)
+    query = db.query(*columns).filter(*filters)
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    rows = query.order_by(model.id).limit(limit).all()
+
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-After-Id"] = str(rows[-1].id)
+
+    adapter = _list_adapter(schema)
+    items = adapter.validate_python([row._asdict() for row in rows])
+    body = adapter.dump_json(items, exclude_unset=True)
+    return conditional_response(request, body, headers=headers)
@@ -0,0 +1,259 @@
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock, local
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import get_current_user
+
+# Profiles kept per worker for GET /internal/profiles
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+# Functions listed in each report
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+
+# Where self time is charged, by the first matching fragment of the
+# function's file or name. Checked in order.
+CATEGORIES = (
+    ("validation", ("SchemaValidator", "pydantic/", "fastapi/dependencies/", "multipart/")),
+    ("serialization", ("SchemaSerializer", "json/", "fastapi/encoders.py", "starlette/responses.py", "app/etag.py")),
+    ("database", ("sqlalchemy/", "psycopg2", "sqlite3")),
+    ("storage", ("app/services/storage.py", "httpx/", "httpcore/", "shutil.py")),
+    ("idle", ("'select' of", "'poll' of", "'acquire' of '_thread.lock'", "'wait' of")),
+)
+
+
+def categorize(filename: str, function: str) -> str:
+    location = filename.replace(os.sep, "/") + " " + function
+    for category, fragments in CATEGORIES:
+        if any(fragment in location for fragment in fragments):
+            return category
+    return "other"
+
+
+class RequestProfile:
+    """
+    cProfile data of one request, from the event loop thread and every
+    worker thread the request ran sync code in.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.created_at = datetime.utcnow()
+        self.status_code: Optional[int] = None
+        self.wall_seconds = 0.0
+        # Wall time measured around calls that do not burn CPU, e.g. storage I/O
+        self.timings: Dict[str, float] = {}
+        self._profilers: List[cProfile.Profile] = []
+        self._lock = Lock()
+
+    def add(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self._profilers.append(profiler)
+
+    def add_timing(self, category: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[category] = self.timings.get(category, 0.0) + seconds
+
+    def run_sync(self, func, *args, **kwargs):
+        # Runs in the worker thread, which has a profiler of its own unless
+        # an outer call already enabled one: a second profiler would replace
+        # the first. From Python 3.12 the event loop's profiler already sees
+        # every thread and a second one cannot be enabled.
+        if getattr(_thread_state, "profiling", False):
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return func(*args, **kwargs)
+        _thread_state.profiling = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            _thread_state.profiling = False
+            self.add(profiler)
+
+    def report(self) -> Dict[str, Any]:
+        stats = pstats.Stats(self._profilers[0])
+        for profiler in self._profilers[1:]:
+            stats.add(profiler)
+
+        self_time: Dict[str, float] = {}
+        for (filename, _, function), (_, _, tt, _, _) in stats.stats.items():
+            category = categorize(filename, function)
+            self_time[category] = self_time.get(category, 0.0) + tt
+
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "created_at": self.created_at.isoformat(),
+            "wall_ms": round(self.wall_seconds * 1000, 3),
+            "threads": len(self._profilers),
+            "self_ms": {category: round(seconds * 1000, 3) for category, seconds in sorted(self_time.items())},
+            "measured_ms": {category: round(seconds * 1000, 3) for category, seconds in sorted(self.timings.items())},
+            "functions": out.getvalue(),
+        }
+
+
+_active_profile: ContextVar[Optional[RequestProfile]] = ContextVar("active_profile", default=None)
+# Whether a profiler is enabled on this thread
+_thread_state = local()
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Wraps sync code that runs in the thread pool so it is profiled when the
+    request that handed it over is. The worker thread runs it in a copy of
+    the request's context, which carries the active profile.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        return profile.run_sync(func, *args, **kwargs)
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route class of every router: sync endpoints are wrapped with `profiled`.
+    The wrapper keeps the endpoint's signature, so its parameters are
+    resolved as before.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "profiled", False):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def record_timing(category: str, seconds: float) -> None:
+    """Add wall time to the profile of the current request, if it is being profiled."""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.add_timing(category, seconds)
+
+
+class ProfileStore:
+    """The last `max_entries` reports of this worker, newest last."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def put(self, report: Dict[str, Any]) -> None:
+        self._reports[report["id"]] = report
+        while len(self._reports) > self.max_entries:
+            self._reports.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._reports.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {key: report[key] for key in ("id", "method", "path", "status_code", "created_at", "wall_ms")}
+            for report in reversed(self._reports.values())
+        ]
+
+
+profile_store = ProfileStore(PROFILE_KEEP)
+
+
+def _wants_profile(scope) -> bool:
+    if parse_qs(scope["query_string"]).get(b"profile") == [b"1"]:
+        return True
+    return any(name == b"x-profile" and value == b"1" for name, value in scope["headers"])
+
+
+async def _is_admin(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=value[7:].decode("latin-1").strip())
+            try:
+                await get_current_user(credentials)
+            except HTTPException:
+                return False
+            return True
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when an admin asks for it with `X-Profile: 1` or
+    `?profile=1`. The report is stored and its id returned in the
+    `X-Profile-Id` header; fetch it from /internal/profiles/{id}.
+
+    One request is profiled at a time per worker. The event loop thread is
+    profiled, so coroutines of other requests running at the same time show
+    up in the report, and sync endpoints and service functions wrapped with
+    `profiled` get a profiler of their own in their worker thread. A second request
+    asking for a profile meanwhile is served unprofiled with
+    `X-Profile: busy`. Other requests only pay for the header check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope) or not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+        if self._lock.locked():
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile", b"busy")]))
+            return
+
+        async with self._lock:
+            profile = RequestProfile(scope["method"], scope["path"])
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    profile.status_code = message["status"]
+                await self._with_headers(send, [(b"x-profile-id", profile.id.encode())])(message)
+
+            token = _active_profile.set(profile)
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            _thread_state.profiling = True
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.disable()
+                _thread_state.profiling = False
+                profile.wall_seconds = time.perf_counter() - started
+                _active_profile.reset(token)
+                profile.add(profiler)
+                profile_store.put(profile.report())
+
+    @staticmethod
+    def _with_headers(send, headers):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+        return wrapped
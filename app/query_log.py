@@ -0,0 +1,205 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+import anyio
+from sqlalchemy import event
+
+from app.database import background_work, engine
+
+logger = logging.getLogger(__name__)
+
+# Record every statement per request and log N+1 candidates and slow
+# queries. Meant for development and staging; off in production.
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "false").lower() in ("1", "true", "yes")
+# Statements at least this slow are logged with their plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# The same statement shape this many times in one request is an N+1 candidate
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+# A parenthesised list of bound parameters, in any DBAPI paramstyle, so
+# IN lists of different lengths have the same shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class Query(NamedTuple):
+    statement: str
+    parameters: Any
+    seconds: float
+    executemany: bool
+
+
+class QueryRecorder:
+    """Statements executed while the recorder is active, in order."""
+
+    def __init__(self):
+        self.queries: List[Query] = []
+        self._lock = Lock()
+
+    def add(self, query: Query) -> None:
+        with self._lock:
+            self.queries.append(query)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times, most frequent first."""
+        shapes = Counter(statement_shape(query.statement) for query in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def slow(self, threshold_ms: float = SLOW_QUERY_MS) -> List[Query]:
+        return [query for query in self.queries if query.seconds * 1000 >= threshold_ms]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {query.seconds * 1000:8.2f} ms  {query.statement}" for query in self.queries]
+        return "\n".join(lines)
+
+
+# The recorder of the request being handled. Handlers running in the thread
+# pool get a copy of the context, so they add to the same recorder.
+_request_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar("query_recorder", default=None)
+# Recorders that see every statement in the process except background
+# work, for tests
+_global_recorders: List[QueryRecorder] = []
+_installed = False
+_install_lock = Lock()
+# Set while explain() runs, so plans are not recorded as queries themselves
+_explaining: ContextVar[bool] = ContextVar("explaining", default=False)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_log_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    query = Query(statement, parameters, time.perf_counter() - conn.info["query_log_started"].pop(), executemany)
+    if _explaining.get():
+        return
+    recorder = _request_recorder.get()
+    if recorder is not None:
+        recorder.add(query)
+    elif query.seconds * 1000 >= SLOW_QUERY_MS:
+        # Outside a request (background writers, scripts) there is nobody
+        # to explain it afterwards
+        logger.warning("Slow query (%.1f ms) outside a request: %s", query.seconds * 1000, statement)
+    if _global_recorders and not background_work.get():
+        for global_recorder in _global_recorders:
+            global_recorder.add(query)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_log_started"):
+        connection.info["query_log_started"].pop()
+
+
+def install() -> None:
+    """Start recording statements. Until this is called, nothing is added to the query path."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+        _installed = True
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryRecorder]:
+    """
+    Record every statement run inside the block, from any thread, except
+    those of background loops.
+    """
+    install()
+    recorder = QueryRecorder()
+    _global_recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        _global_recorders.remove(recorder)
+
+
+def explain(query: Query) -> str:
+    """
+    Plan of a recorded statement, fetched on a connection of its own. Only
+    SELECTs are explained, and without ANALYZE, so nothing is run again.
+    """
+    if query.executemany or query.statement.split(None, 1)[0].upper() not in ("SELECT", "WITH"):
+        return "(not explained)"
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    token = _explaining.set(True)
+    try:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(prefix + query.statement, query.parameters).fetchall()
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+    finally:
+        _explaining.reset(token)
+    return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+
+
+def log_request(method: str, route: str, recorder: QueryRecorder) -> None:
+    for shape, count in recorder.repeated():
+        logger.warning("N+1 candidate on %s %s: %d executions of %s", method, route, count, shape)
+    for query in recorder.slow():
+        logger.warning(
+            "Slow query (%.1f ms) on %s %s: %s\n%s",
+            query.seconds * 1000, method, route, query.statement, explain(query),
+        )
+    logger.debug("%s %s: %d queries in %.1f ms", method, route, recorder.count, recorder.seconds * 1000)
+
+
+class QueryLogMiddleware:
+    """
+    ASGI middleware that records the statements of each request and logs
+    N+1 candidates and slow queries once the response has been sent. The
+    Server-Timing header shows the queries run before the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = QueryRecorder()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing = f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries"'
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        token = _request_recorder.set(recorder)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_recorder.reset(token)
+            route = getattr(scope.get("route"), "path", scope["path"])
+            if recorder.slow():
+                # EXPLAIN needs a connection of its own
+                await anyio.to_thread.run_sync(log_request, scope["method"], route, recorder)
+            else:
+                log_request(scope["method"], route, recorder)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.attempt import Attempt, AttemptResponse, AttemptListItem
+from app.auth import get_current_user
+from app.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/attempts", tags=["Attempts"], route_class=ProfiledRoute)
+
+
+@router.get("/", response_model=List[AttemptListItem], response_model_exclude_unset=True)
+def get_attempts(
+    request: Request,
+    student_id: Optional[str] = None,
+    test_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    filters = []
+    if student_id is not None:
+        filters.append(Attempt.student_id == student_id)
+    if test_id is not None:
+        filters.append(Attempt.test_id == test_id)
+    return keyset_page(
+        db, Attempt, AttemptListItem, request,
+        after_id=after_id, limit=limit, fields=fields, filters=filters
+    )
+
+
+@router.get("/{attempt_id}", response_model=AttemptResponse)
+def get_attempt(
+    attempt_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    attempt = db.query(Attempt).filter(Attempt.id == attempt_id).first()
+    if not attempt:
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    return attempt
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from app.auth import authenticate_admin, create_access_token
+from app.auth import authenticate_admin, create_access_token, get_current_user, revoke_token, security
+from app.models.token import TokenRevoke
+from app.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=ProfiledRoute)
 
 
 class AdminLogin(BaseModel):
@@ -27,4 +30,26 @@ async def admin_login(login_data: AdminLogin):
     return {
         "access_token": access_token,
         "token_type": "bearer"
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/logout")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user)
+):
+    revoke_token(credentials.credentials)
+    return {"message": "Token revoked"}
+
+
+@router.post("/revoke")
+def revoke(revoke_data: TokenRevoke, current_user: dict = Depends(get_current_user)):
+    """
+    Revoke another token, e.g. one that has leaked, before it expires.
+    """
+    if not revoke_token(revoke_data.token):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token is invalid or already expired"
+        )
+    return {"message": "Token revoked"}
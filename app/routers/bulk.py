@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from app.auth import get_current_user
+from app.models.bulk import ImportResult
+from app.profiling import ProfiledRoute
+from app.services.bulk import export_tests, import_tests
+
+router = APIRouter(prefix="/bulk", tags=["Bulk"], route_class=ProfiledRoute)
+
+
+@router.post("/tests/import", response_model=ImportResult)
+async def import_complete_tests(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Create complete tests, each with its sections, from an NDJSON or JSON
+    array body. Invalid records are reported in `errors` and the rest are
+    still imported.
+    """
+    return await import_tests(request.stream())
+
+
+@router.get("/tests/export")
+def export_complete_tests(
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Every test with all of its sections and answer keys, one per line as
+    NDJSON, in the format accepted by the import.
+    """
+    if gzip:
+        # A gzip file rather than a gzip-encoded body, so clients that decode
+        # Content-Encoding do not save plain NDJSON under a .gz name
+        filename, media_type = "tests.ndjson.gz", "application/gzip"
+    else:
+        filename, media_type = "tests.ndjson", "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(export_tests(compress=gzip), media_type=media_type, headers=headers)
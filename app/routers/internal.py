@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Any, List
+
+from app.admission import admission_controller
+from app.database import pool_status
+from app.profiling import ProfiledRoute, profile_store
+from app.auth import get_current_user, token_cache
+from app.services.cache import content_cache
+from app.services.attempts import attempt_writer
+from app.services.media import media_cache
+from app.services.revocation import revocation_store
+from app.services.upload import upload_service
+
+router = APIRouter(prefix="/internal", tags=["Internal"], route_class=ProfiledRoute)
+
+
+@router.get("/db-pool", response_model=Dict[str, Any])
+async def get_db_pool(current_user: dict = Depends(get_current_user)):
+    """
+    Connection pool state and checkout wait-time histogram.
+
+    Histogram buckets are cumulative and keyed by their upper bound in ms.
+    """
+    return pool_status()
+
+
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Hit, miss and eviction counters of the test content cache.
+    """
+    return content_cache.stats()
+
+
+@router.delete("/cache")
+async def clear_cache(current_user: dict = Depends(get_current_user)):
+    content_cache.clear()
+    return {"message": "Content cache cleared"}
+
+
+
+@router.get("/attempt-writer", response_model=Dict[str, Any])
+async def get_attempt_writer_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Backlog and flush counters of the attempt write-behind queue.
+    """
+    return attempt_writer.stats()
+
+
+
+@router.get("/storage", response_model=Dict[str, Any])
+async def get_storage_stats(current_user: dict = Depends(get_current_user)):
+    return upload_service.storage.stats()
+
+
+@router.get("/media-cache", response_model=Dict[str, Any])
+async def get_media_cache_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Size and hit counters of the local disk cache behind /media.
+    """
+    return media_cache.stats()
+
+
+@router.delete("/media-cache")
+async def clear_media_cache(current_user: dict = Depends(get_current_user)):
+    media_cache.clear()
+    return {"message": "Media cache cleared"}
+
+
+@router.get("/auth", response_model=Dict[str, Any])
+async def get_auth_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Verified-token cache counters and size of the revocation list.
+    """
+    return {"token_cache": token_cache.stats(), "revocation": revocation_store.stats()}
+
+
+@router.get("/admission", response_model=Dict[str, Any])
+async def get_admission_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Admission decisions of this worker, overall and per route.
+    """
+    return admission_controller.stats()
+
+
+@router.delete("/admission")
+async def reset_admission_stats(current_user: dict = Depends(get_current_user)):
+    admission_controller.reset()
+    return {"message": "Admission counters reset"}
+
+
+@router.get("/profiles", response_model=List[Dict[str, Any]])
+async def list_profiles(current_user: dict = Depends(get_current_user)):
+    """
+    Requests profiled on this worker, newest first.
+    """
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}", response_model=Dict[str, Any])
+async def get_profile(profile_id: str, current_user: dict = Depends(get_current_user)):
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
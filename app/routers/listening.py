@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
-from app.models.listening import Listening, ListeningCreate, ListeningUpdate, ListeningResponse
-from app.auth import get_current_user
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.grading import GradeRequest, GradeResponse, BatchGradeRequest
+from app.models.listening import Listening, ListeningCreate, ListeningUpdate, ListeningResponse, ListeningAdminResponse, ListeningListItem
+from app.auth import get_current_user, get_optional_user
+from app.profiling import ProfiledRoute
+from app.services.cache import content_cache
+from app.etag import conditional_response
+from app.services.grading import answer_keys, load_answer_key, grade_batch, record_attempts
 
-router = APIRouter(prefix="/listening", tags=["Listening"])
+router = APIRouter(prefix="/listening", tags=["Listening"], route_class=ProfiledRoute)
 
 
-@router.post("/", response_model=ListeningResponse)
-async def create_listening(
+@router.post("/", response_model=ListeningAdminResponse)
+def create_listening(
     listening: ListeningCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -19,32 +26,113 @@ async def create_listening(
     db.add(db_listening)
     db.commit()
     db.refresh(db_listening)
+    content_cache.invalidate_section("listening", db_listening.id, db_listening.test_id)
     return db_listening
 
 
-@router.get("/", response_model=List[ListeningResponse])
-async def get_all_listening(db: Session = Depends(get_db)):
-    return db.query(Listening).all()
+@router.get("/", response_model=List[ListeningListItem], response_model_exclude_unset=True)
+def get_all_listening(
+    request: Request,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return keyset_page(db, Listening, ListeningListItem, request, after_id=after_id, limit=limit, fields=fields)
 
 
 @router.get("/test/{test_id}", response_model=ListeningResponse)
-async def get_listening_by_test(test_id: int, db: Session = Depends(get_db)):
-    listening = db.query(Listening).filter(Listening.test_id == test_id).first()
-    if not listening:
-        raise HTTPException(status_code=404, detail="Listening section not found")
-    return listening
+def get_listening_by_test(test_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("listening", "test", test_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        listening = db.query(Listening).filter(Listening.test_id == test_id).first()
+        if not listening:
+            raise HTTPException(status_code=404, detail="Listening section not found")
+        cached = content_cache.put(key, ListeningResponse.model_validate(listening), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.get("/{listening_id}", response_model=ListeningResponse)
-async def get_listening(listening_id: int, db: Session = Depends(get_db)):
+def get_listening(listening_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("listening", "id", listening_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        listening = db.query(Listening).filter(Listening.id == listening_id).first()
+        if not listening:
+            raise HTTPException(status_code=404, detail="Listening section not found")
+        cached = content_cache.put(key, ListeningResponse.model_validate(listening), generation)
+    return conditional_response(request, cached.body, cached.etag)
+
+
+@router.get("/{listening_id}/answers", response_model=ListeningAdminResponse)
+def get_listening_answers(
+    listening_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
     listening = db.query(Listening).filter(Listening.id == listening_id).first()
     if not listening:
         raise HTTPException(status_code=404, detail="Listening section not found")
     return listening
 
 
-@router.put("/{listening_id}", response_model=ListeningResponse)
-async def update_listening(
+@router.post("/{listening_id}/grade", response_model=GradeResponse)
+def grade_listening(
+    listening_id: int,
+    submission: GradeRequest,
+    db: Session = Depends(get_db),
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Grade one submission. Anyone may grade; recording the attempt under
+    `student_id` needs an admin token, or anyone could write attempts for
+    any student.
+    """
+    if submission.student_id is not None and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Recording an attempt needs an admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    answer_key = load_answer_key(db, Listening, "listening", listening_id)
+    if answer_key is None:
+        raise HTTPException(status_code=404, detail="Listening section not found")
+    result = answer_key.grade(submission.answers)
+    record_attempts(answer_key, [(submission.student_id, submission.answers, result)])
+    return result
+
+
+@router.post("/{listening_id}/grade/batch")
+def grade_listening_batch(
+    listening_id: int,
+    batch: BatchGradeRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Grade many submissions for one listening section. Admin only: a batch
+    keeps the grading process pool busy, and records attempts for the
+    students it names.
+
+    Results are streamed back as NDJSON, one line per submission in the
+    order they were sent, each with its `index` and `student_id`.
+    """
+    answer_key = load_answer_key(db, Listening, "listening", listening_id)
+    if answer_key is None:
+        raise HTTPException(status_code=404, detail="Listening section not found")
+
+    submissions = [
+        (index, submission.student_id, submission.answers)
+        for index, submission in enumerate(batch.submissions)
+    ]
+    return StreamingResponse(grade_batch(answer_key, submissions), media_type="application/x-ndjson")
+
+
+@router.put("/{listening_id}", response_model=ListeningAdminResponse)
+def update_listening(
     listening_id: int,
     listening_update: ListeningUpdate,
     db: Session = Depends(get_db),
@@ -59,11 +147,13 @@ async def update_listening(
     
     db.commit()
     db.refresh(listening)
+    content_cache.invalidate_section("listening", listening.id, listening.test_id)
+    answer_keys.invalidate("listening", listening.id)
     return listening
 
 
 @router.delete("/{listening_id}")
-async def delete_listening(
+def delete_listening(
     listening_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -72,6 +162,9 @@ async def delete_listening(
     if not listening:
         raise HTTPException(status_code=404, detail="Listening section not found")
     
+    test_id = listening.test_id
     db.delete(listening)
     db.commit()
+    content_cache.invalidate_section("listening", listening_id, test_id)
+    answer_keys.invalidate("listening", listening_id)
     return {"message": "Listening section deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,89 @@
+import mimetypes
+import os
+import re
+from email.utils import parsedate_to_datetime
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from starlette.background import BackgroundTask
+
+from app.etag import compute_etag, etag_matches
+from app.profiling import ProfiledRoute
+from app.services.media import media_cache
+from app.services.storage import StorageError
+from app.services.upload import EXTENSIONS
+
+router = APIRouter(prefix="/media", tags=["Media"], route_class=ProfiledRoute)
+
+# Seconds clients may cache objects whose name is not a content hash
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))
+
+# Object names containing a SHA-256 never change content
+_CONTENT_ADDRESSED = re.compile(r"(^|/)[0-9a-f]{64}(/|\.)")
+_CONTENT_TYPES = {extension: content_type for content_type, extension in EXTENSIONS.items()}
+
+
+def _content_type(path: str) -> str:
+    extension = path.rsplit(".", 1)[-1].lower()
+    return _CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _not_modified(request: Request, response: FileResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, response.headers["etag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            modified = parsedate_to_datetime(response.headers["last-modified"])
+        except (TypeError, ValueError):
+            return False
+        return modified <= since
+    return False
+
+
+@router.api_route("/{object_path:path}", methods=["GET", "HEAD"])
+async def get_media(object_path: str, request: Request):
+    """
+    Serve a stored audio or image file, with `Range` support for seeking.
+
+    Objects are read from the local disk cache, which is filled from the
+    storage backend on a miss.
+    """
+    try:
+        path, temporary = await media_cache.get(object_path)
+    except StorageError as e:
+        # 400 is a path the backend refuses, e.g. one leaving its root
+        if e.status_code in (400, 404):
+            raise HTTPException(status_code=404, detail="File not found")
+        raise HTTPException(status_code=502, detail=f"Storage error: {str(e)}")
+
+    headers = {}
+    if _CONTENT_ADDRESSED.search(object_path):
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        # The default ETag comes from the file's mtime, which changes every
+        # time the object is cached again; the name never does
+        headers["ETag"] = compute_etag(object_path.encode())
+    else:
+        headers["Cache-Control"] = f"public, max-age={MEDIA_MAX_AGE}"
+
+    response = FileResponse(
+        path,
+        stat_result=os.stat(path),
+        media_type=_content_type(object_path),
+        headers=headers,
+        background=BackgroundTask(os.unlink, path) if temporary else None,
+    )
+    if _not_modified(request, response):
+        if temporary:
+            os.unlink(path)
+        return Response(
+            status_code=304,
+            headers={
+                "ETag": response.headers["etag"],
+                "Last-Modified": response.headers["last-modified"],
+                "Cache-Control": headers["Cache-Control"],
+            },
+        )
+    return response
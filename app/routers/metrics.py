@@ -0,0 +1,25 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import METRICS_TOKEN, render_metrics
+from app.profiling import ProfiledRoute
+
+router = APIRouter(tags=["Internal"], route_class=ProfiledRoute)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Request, database and storage metrics of this worker in the Prometheus
+    text format.
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
-from app.models.reading import Reading, ReadingCreate, ReadingUpdate, ReadingResponse
-from app.auth import get_current_user
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.grading import GradeRequest, GradeResponse, BatchGradeRequest
+from app.models.reading import Reading, ReadingCreate, ReadingUpdate, ReadingResponse, ReadingAdminResponse, ReadingListItem
+from app.auth import get_current_user, get_optional_user
+from app.profiling import ProfiledRoute
+from app.services.cache import content_cache
+from app.etag import conditional_response
+from app.services.grading import answer_keys, load_answer_key, grade_batch, record_attempts
 
-router = APIRouter(prefix="/reading", tags=["Reading"])
+router = APIRouter(prefix="/reading", tags=["Reading"], route_class=ProfiledRoute)
 
 
-@router.post("/", response_model=ReadingResponse)
-async def create_reading(
+@router.post("/", response_model=ReadingAdminResponse)
+def create_reading(
     reading: ReadingCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -19,32 +26,113 @@ async def create_reading(
     db.add(db_reading)
     db.commit()
     db.refresh(db_reading)
+    content_cache.invalidate_section("reading", db_reading.id, db_reading.test_id)
     return db_reading
 
 
-@router.get("/", response_model=List[ReadingResponse])
-async def get_all_reading(db: Session = Depends(get_db)):
-    return db.query(Reading).all()
+@router.get("/", response_model=List[ReadingListItem], response_model_exclude_unset=True)
+def get_all_reading(
+    request: Request,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return keyset_page(db, Reading, ReadingListItem, request, after_id=after_id, limit=limit, fields=fields)
 
 
 @router.get("/test/{test_id}", response_model=ReadingResponse)
-async def get_reading_by_test(test_id: int, db: Session = Depends(get_db)):
-    reading = db.query(Reading).filter(Reading.test_id == test_id).first()
-    if not reading:
-        raise HTTPException(status_code=404, detail="Reading section not found")
-    return reading
+def get_reading_by_test(test_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("reading", "test", test_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        reading = db.query(Reading).filter(Reading.test_id == test_id).first()
+        if not reading:
+            raise HTTPException(status_code=404, detail="Reading section not found")
+        cached = content_cache.put(key, ReadingResponse.model_validate(reading), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.get("/{reading_id}", response_model=ReadingResponse)
-async def get_reading(reading_id: int, db: Session = Depends(get_db)):
+def get_reading(reading_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("reading", "id", reading_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        reading = db.query(Reading).filter(Reading.id == reading_id).first()
+        if not reading:
+            raise HTTPException(status_code=404, detail="Reading section not found")
+        cached = content_cache.put(key, ReadingResponse.model_validate(reading), generation)
+    return conditional_response(request, cached.body, cached.etag)
+
+
+@router.get("/{reading_id}/answers", response_model=ReadingAdminResponse)
+def get_reading_answers(
+    reading_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
     reading = db.query(Reading).filter(Reading.id == reading_id).first()
     if not reading:
         raise HTTPException(status_code=404, detail="Reading section not found")
     return reading
 
 
-@router.put("/{reading_id}", response_model=ReadingResponse)
-async def update_reading(
+@router.post("/{reading_id}/grade", response_model=GradeResponse)
+def grade_reading(
+    reading_id: int,
+    submission: GradeRequest,
+    db: Session = Depends(get_db),
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Grade one submission. Anyone may grade; recording the attempt under
+    `student_id` needs an admin token, or anyone could write attempts for
+    any student.
+    """
+    if submission.student_id is not None and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Recording an attempt needs an admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    answer_key = load_answer_key(db, Reading, "reading", reading_id)
+    if answer_key is None:
+        raise HTTPException(status_code=404, detail="Reading section not found")
+    result = answer_key.grade(submission.answers)
+    record_attempts(answer_key, [(submission.student_id, submission.answers, result)])
+    return result
+
+
+@router.post("/{reading_id}/grade/batch")
+def grade_reading_batch(
+    reading_id: int,
+    batch: BatchGradeRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Grade many submissions for one reading section. Admin only: a batch
+    keeps the grading process pool busy, and records attempts for the
+    students it names.
+
+    Results are streamed back as NDJSON, one line per submission in the
+    order they were sent, each with its `index` and `student_id`.
+    """
+    answer_key = load_answer_key(db, Reading, "reading", reading_id)
+    if answer_key is None:
+        raise HTTPException(status_code=404, detail="Reading section not found")
+
+    submissions = [
+        (index, submission.student_id, submission.answers)
+        for index, submission in enumerate(batch.submissions)
+    ]
+    return StreamingResponse(grade_batch(answer_key, submissions), media_type="application/x-ndjson")
+
+
+@router.put("/{reading_id}", response_model=ReadingAdminResponse)
+def update_reading(
     reading_id: int,
     reading_update: ReadingUpdate,
     db: Session = Depends(get_db),
@@ -59,11 +147,13 @@ async def update_reading(
     
     db.commit()
     db.refresh(reading)
+    content_cache.invalidate_section("reading", reading.id, reading.test_id)
+    answer_keys.invalidate("reading", reading.id)
     return reading
 
 
 @router.delete("/{reading_id}")
-async def delete_reading(
+def delete_reading(
     reading_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -72,6 +162,9 @@ async def delete_reading(
     if not reading:
         raise HTTPException(status_code=404, detail="Reading section not found")
     
+    test_id = reading.test_id
     db.delete(reading)
     db.commit()
+    content_cache.invalidate_section("reading", reading_id, test_id)
+    answer_keys.invalidate("reading", reading_id)
     return {"message": "Reading section deleted successfully"}
\ No newline at end of file
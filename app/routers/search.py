@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.models.search import SearchResponse
+from app.profiling import ProfiledRoute
+from app.services.search import SEARCH_SECTIONS, search_backend
+
+router = APIRouter(prefix="/search", tags=["Search"], route_class=ProfiledRoute)
+
+
+@router.get("/", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    sections: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: Session = Depends(get_db)
+):
+    selected = list(SEARCH_SECTIONS)
+    if sections:
+        selected = [section.strip() for section in sections.split(",") if section.strip()]
+        unknown = [section for section in selected if section not in SEARCH_SECTIONS]
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown sections: {', '.join(unknown)}. Allowed: {', '.join(SEARCH_SECTIONS)}"
+            )
+
+    results = search_backend.search(db, q, selected, limit=limit, offset=offset)
+    return {"query": q, "limit": limit, "offset": offset, "results": results}
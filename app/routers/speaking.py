@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import logging
 
 from app.database import get_db
-from app.models.speaking import Speaking, SpeakingCreate, SpeakingUpdate, SpeakingResponse
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.speaking import Speaking, SpeakingCreate, SpeakingUpdate, SpeakingResponse, SpeakingListItem
 from app.auth import get_current_user
+from app.profiling import ProfiledRoute
+from app.services.cache import content_cache
+from app.etag import conditional_response
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/speaking", tags=["Speaking"])
+router = APIRouter(prefix="/speaking", tags=["Speaking"], route_class=ProfiledRoute)
 
 
 @router.post("/", response_model=SpeakingResponse)
-async def create_speaking(
+def create_speaking(
     speaking: SpeakingCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -22,34 +26,51 @@ async def create_speaking(
     db.add(db_speaking)
     db.commit()
     db.refresh(db_speaking)
+    content_cache.invalidate_section("speaking", db_speaking.id, db_speaking.test_id)
     return db_speaking
 
 
-@router.get("/", response_model=List[SpeakingResponse])
-async def get_all_speaking(db: Session = Depends(get_db)):
-    return db.query(Speaking).all()
+@router.get("/", response_model=List[SpeakingListItem], response_model_exclude_unset=True)
+def get_all_speaking(
+    request: Request,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return keyset_page(db, Speaking, SpeakingListItem, request, after_id=after_id, limit=limit, fields=fields)
 
 
 @router.get("/test/{test_id}", response_model=SpeakingResponse)
-async def get_speaking_by_test(test_id: int, db: Session = Depends(get_db)):
-    speaking = db.query(Speaking).filter(Speaking.test_id == test_id).order_by(Speaking.id).first()
-    if not speaking:
-        logger.warning(f"Speaking section not found for test_id: {test_id}")
-        raise HTTPException(status_code=404, detail="Speaking section not found")
-    logger.info(f"Retrieved speaking data - test_id: {test_id}, speaking_id: {speaking.id}")
-    return speaking
+def get_speaking_by_test(test_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("speaking", "test", test_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        speaking = db.query(Speaking).filter(Speaking.test_id == test_id).order_by(Speaking.id).first()
+        if not speaking:
+            logger.warning("Speaking section not found for test_id: %s", test_id)
+            raise HTTPException(status_code=404, detail="Speaking section not found")
+        logger.info("Retrieved speaking data - test_id: %s, speaking_id: %s", test_id, speaking.id)
+        cached = content_cache.put(key, SpeakingResponse.model_validate(speaking), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.get("/{speaking_id}", response_model=SpeakingResponse)
-async def get_speaking(speaking_id: int, db: Session = Depends(get_db)):
-    speaking = db.query(Speaking).filter(Speaking.id == speaking_id).first()
-    if not speaking:
-        raise HTTPException(status_code=404, detail="Speaking section not found")
-    return speaking
+def get_speaking(speaking_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("speaking", "id", speaking_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        speaking = db.query(Speaking).filter(Speaking.id == speaking_id).first()
+        if not speaking:
+            raise HTTPException(status_code=404, detail="Speaking section not found")
+        cached = content_cache.put(key, SpeakingResponse.model_validate(speaking), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.put("/{speaking_id}", response_model=SpeakingResponse)
-async def update_speaking(
+def update_speaking(
     speaking_id: int,
     speaking_update: SpeakingUpdate,
     db: Session = Depends(get_db),
@@ -64,11 +85,12 @@ async def update_speaking(
     
     db.commit()
     db.refresh(speaking)
+    content_cache.invalidate_section("speaking", speaking.id, speaking.test_id)
     return speaking
 
 
 @router.delete("/{speaking_id}")
-async def delete_speaking(
+def delete_speaking(
     speaking_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -77,6 +99,8 @@ async def delete_speaking(
     if not speaking:
         raise HTTPException(status_code=404, detail="Speaking section not found")
     
+    test_id = speaking.test_id
     db.delete(speaking)
     db.commit()
+    content_cache.invalidate_section("speaking", speaking_id, test_id)
     return {"message": "Speaking section deleted successfully"}
\ No newline at end of file
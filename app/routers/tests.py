@@ -1,43 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, contains_eager
+from typing import List, Optional
 
 from app.database import get_db
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.listening import Listening
+from app.models.reading import Reading
+from app.models.speaking import Speaking
 from app.models.test import Test
-from app.models.test import TestCreate, TestUpdate, TestResponse
+from app.models.test import TestCreate, TestUpdate, TestResponse, TestListItem, TestFullResponse
+from app.models.writing import Writing
 from app.auth import get_current_user
+from app.profiling import ProfiledRoute
+from app.services.cache import content_cache
+from app.services.upload import upload_service
+from app.etag import conditional_response
 
-router = APIRouter(prefix="/tests", tags=["Tests"])
+router = APIRouter(prefix="/tests", tags=["Tests"], route_class=ProfiledRoute)
+
+# Section models and the relationships of Test that hold them
+SECTIONS = (
+    (Listening, Test.listening),
+    (Reading, Test.reading),
+    (Speaking, Test.speaking),
+    (Writing, Test.writing),
+)
 
 
 @router.post("/", response_model=TestResponse)
-async def create_test(
+def create_test(
     test: TestCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    db_test = Test(**test.dict())
+    db_test = Test(**test.dict(), image_variants=upload_service.image_variants(test.image))
     db.add(db_test)
     db.commit()
     db.refresh(db_test)
     return db_test
 
 
-@router.get("/", response_model=List[TestResponse])
-async def get_tests(db: Session = Depends(get_db)):
-    return db.query(Test).all()
+@router.get("/", response_model=List[TestListItem], response_model_exclude_unset=True)
+def get_tests(
+    request: Request,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return keyset_page(db, Test, TestListItem, request, after_id=after_id, limit=limit, fields=fields)
 
 
 @router.get("/{test_id}", response_model=TestResponse)
-async def get_test(test_id: int, db: Session = Depends(get_db)):
-    test = db.query(Test).filter(Test.id == test_id).first()
-    if not test:
-        raise HTTPException(status_code=404, detail="Test not found")
-    return test
+def get_test(test_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("tests", "id", test_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        test = db.query(Test).filter(Test.id == test_id).first()
+        if not test:
+            raise HTTPException(status_code=404, detail="Test not found")
+        cached = content_cache.put(key, TestResponse.model_validate(test), generation)
+    return conditional_response(request, cached.body, cached.etag)
+
+
+@router.get("/{test_id}/full", response_model=TestFullResponse)
+def get_full_test(test_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("tests", "full", test_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        # A test can have more than one row of a section. Each join only
+        # takes the row with the lowest id, the one GET /{section}/test/{id}
+        # returns, so the single query cannot multiply rows.
+        query = db.query(Test)
+        for model, relationship in SECTIONS:
+            first_id = select(func.min(model.id)).where(model.test_id == test_id).scalar_subquery()
+            query = query.outerjoin(model, model.id == first_id).options(contains_eager(relationship))
+        test = query.filter(Test.id == test_id).first()
+        if not test:
+            raise HTTPException(status_code=404, detail="Test not found")
+        cached = content_cache.put(key, TestFullResponse.model_validate(test), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.put("/{test_id}", response_model=TestResponse)
-async def update_test(
+def update_test(
     test_id: int,
     test_update: TestUpdate,
     db: Session = Depends(get_db),
@@ -49,14 +98,16 @@ async def update_test(
     
     for field, value in test_update.dict(exclude_unset=True).items():
         setattr(test, field, value)
+    test.image_variants = upload_service.image_variants(test.image)
     
     db.commit()
     db.refresh(test)
+    content_cache.invalidate_test(test_id)
     return test
 
 
 @router.delete("/{test_id}")
-async def delete_test(
+def delete_test(
     test_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -67,4 +118,5 @@ async def delete_test(
     
     db.delete(test)
     db.commit()
+    content_cache.invalidate_test(test_id)
     return {"message": "Test deleted successfully"}
\ No newline at end of file
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
 from fastapi.security import HTTPBearer
 from typing import Dict, Any
+from app.models.upload import UploadSessionCreate, UploadSessionResponse
+from app.profiling import ProfiledRoute
+from app.services.media import media_cache
+from app.services.resumable import resumable_uploads
 from app.services.upload import upload_service
 from app.auth import get_current_user
 
 router = APIRouter(
     prefix="/upload",
-    tags=["upload"]
+    tags=["upload"],
+    route_class=ProfiledRoute,
 )
 
 security = HTTPBearer()
@@ -85,10 +90,13 @@ async def delete_file(
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Delete a file from Supabase storage.
+    Delete a file from storage, with the resized variants of an image.
+    Refused with 409 while a test still uses the file.
     """
     try:
         result = await upload_service.delete_file(file_path)
+        for path in result["deleted"]:
+            media_cache.invalidate(path)
         return {
             "message": "File deleted successfully",
             "data": result
@@ -100,4 +108,69 @@ async def delete_file(
         raise HTTPException(
             status_code=500,
             detail=f"File deletion failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/audio/sessions", response_model=UploadSessionResponse, status_code=201)
+def create_audio_upload_session(
+    session: UploadSessionCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Start a resumable audio upload. Send the file with
+    PUT /upload/audio/sessions/{session_id}?offset=N, then complete it.
+    """
+    return resumable_uploads.create(
+        file_type="audio",
+        folder="audio",
+        filename=session.filename,
+        size=session.size,
+        content_type=session.content_type
+    )
+
+
+@router.get("/audio/sessions/{session_id}", response_model=UploadSessionResponse)
+def get_audio_upload_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Bytes received so far; a client resumes from `offset`.
+    """
+    return resumable_uploads.status(session_id)
+
+
+@router.put("/audio/sessions/{session_id}", response_model=UploadSessionResponse)
+async def upload_audio_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Append the request body, which must start at `offset`.
+    """
+    return await resumable_uploads.append(session_id, offset, request.stream())
+
+
+@router.post("/audio/sessions/{session_id}/complete", response_model=Dict[str, Any])
+async def complete_audio_upload(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Store the fully received file. Returns the same data as POST /upload/audio.
+    """
+    result = await resumable_uploads.complete(session_id)
+    return {
+        "message": "Audio file uploaded successfully",
+        "data": result
+    }
+
+
+@router.delete("/audio/sessions/{session_id}")
+def cancel_audio_upload(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    resumable_uploads.cancel(session_id)
+    return {"message": "Upload session cancelled"}
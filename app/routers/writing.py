@@ -1,50 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
-from app.models.writing import Writing, WritingCreate, WritingUpdate, WritingResponse
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.writing import Writing, WritingCreate, WritingUpdate, WritingResponse, WritingListItem
 from app.auth import get_current_user
+from app.profiling import ProfiledRoute
+from app.services.cache import content_cache
+from app.services.upload import upload_service
+from app.etag import conditional_response
 
-router = APIRouter(prefix="/writing", tags=["Writing"])
+router = APIRouter(prefix="/writing", tags=["Writing"], route_class=ProfiledRoute)
 
 
 @router.post("/", response_model=WritingResponse)
-async def create_writing(
+def create_writing(
     writing: WritingCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    db_writing = Writing(**writing.dict())
+    db_writing = Writing(
+        **writing.dict(),
+        task_1_image_variants=upload_service.image_variants(writing.task_1_image_url),
+        task_2_image_variants=upload_service.image_variants(writing.task_2_image_url),
+    )
     db.add(db_writing)
     db.commit()
     db.refresh(db_writing)
+    content_cache.invalidate_section("writing", db_writing.id, db_writing.test_id)
     return db_writing
 
 
-@router.get("/", response_model=List[WritingResponse])
-async def get_all_writing(db: Session = Depends(get_db)):
-    return db.query(Writing).all()
+@router.get("/", response_model=List[WritingListItem], response_model_exclude_unset=True)
+def get_all_writing(
+    request: Request,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return keyset_page(db, Writing, WritingListItem, request, after_id=after_id, limit=limit, fields=fields)
 
 
 @router.get("/test/{test_id}", response_model=WritingResponse)
-async def get_writing_by_test(test_id: int, db: Session = Depends(get_db)):
-    writing = db.query(Writing).filter(Writing.test_id == test_id).first()
-    if not writing:
-        raise HTTPException(status_code=404, detail="Writing section not found")
-    return writing
+def get_writing_by_test(test_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("writing", "test", test_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        writing = db.query(Writing).filter(Writing.test_id == test_id).first()
+        if not writing:
+            raise HTTPException(status_code=404, detail="Writing section not found")
+        cached = content_cache.put(key, WritingResponse.model_validate(writing), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.get("/{writing_id}", response_model=WritingResponse)
-async def get_writing(writing_id: int, db: Session = Depends(get_db)):
-    writing = db.query(Writing).filter(Writing.id == writing_id).first()
-    if not writing:
-        raise HTTPException(status_code=404, detail="Writing section not found")
-    return writing
+def get_writing(writing_id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("writing", "id", writing_id)
+    cached = content_cache.get(key)
+    if cached is None:
+        generation = content_cache.generation(key)
+        writing = db.query(Writing).filter(Writing.id == writing_id).first()
+        if not writing:
+            raise HTTPException(status_code=404, detail="Writing section not found")
+        cached = content_cache.put(key, WritingResponse.model_validate(writing), generation)
+    return conditional_response(request, cached.body, cached.etag)
 
 
 @router.put("/{writing_id}", response_model=WritingResponse)
-async def update_writing(
+def update_writing(
     writing_id: int,
     writing_update: WritingUpdate,
     db: Session = Depends(get_db),
@@ -56,14 +82,17 @@ async def update_writing(
     
     for field, value in writing_update.dict(exclude_unset=True).items():
         setattr(writing, field, value)
+    writing.task_1_image_variants = upload_service.image_variants(writing.task_1_image_url)
+    writing.task_2_image_variants = upload_service.image_variants(writing.task_2_image_url)
     
     db.commit()
     db.refresh(writing)
+    content_cache.invalidate_section("writing", writing.id, writing.test_id)
     return writing
 
 
 @router.delete("/{writing_id}")
-async def delete_writing(
+def delete_writing(
     writing_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -72,6 +101,8 @@ async def delete_writing(
     if not writing:
         raise HTTPException(status_code=404, detail="Writing section not found")
     
+    test_id = writing.test_id
     db.delete(writing)
     db.commit()
+    content_cache.invalidate_section("writing", writing_id, test_id)
     return {"message": "Writing section deleted successfully"}
\ No newline at end of file
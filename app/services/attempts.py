@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.database import SessionLocal, background_work
+from app.models.attempt import Attempt
+
+logger = logging.getLogger(__name__)
+
+
+class AttemptWriter:
+    """
+    Write-behind queue for attempt rows.
+
+    Requests only append to an in-memory queue. A background thread inserts
+    the rows in batches, either when `flush_size` rows are waiting or every
+    `flush_interval` seconds. In "sync" mode every add is inserted before the
+    request returns. Rows still queued when the process is killed without a
+    graceful shutdown are lost, and that is the durability trade-off.
+
+    A batch the database rejects (e.g. an attempt whose test was deleted
+    meanwhile) is written again one row at a time, so one bad row does not
+    hold up the others; a row rejected `max_retries` times is logged and
+    dropped. While the database is unreachable rows are kept, up to
+    `max_queued`; beyond that new rows are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        flush_size: int,
+        flush_interval: float,
+        max_pending: int,
+        max_queued: int,
+        max_retries: int,
+    ):
+        self.mode = mode
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_queued = max_queued
+        self.max_retries = max_retries
+        # [row, times the database rejected it] pairs
+        self._pending: deque = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        # Set while the database is failing, so requests stop flushing
+        self._failing = False
+
+    def start(self) -> None:
+        if self.mode != "async" or self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Flush everything still queued and stop the background thread."""
+        if self._thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.add_many([row])
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        now = datetime.utcnow()
+        for row in rows:
+            row.setdefault("created_at", now)
+
+        if self.mode != "async" or self._thread is None:
+            self._insert(rows)
+            return
+
+        with self._condition:
+            room = max(0, self.max_queued - len(self._pending))
+            overflow = rows[room:]
+            self._pending.extend([row, 0] for row in rows[:room])
+            backlog = len(self._pending)
+            if backlog >= self.flush_size:
+                self._condition.notify()
+        if overflow:
+            self.dropped += len(overflow)
+            logger.error("Attempt queue is full (%d rows), dropping %d attempts", backlog, len(overflow))
+        if backlog > self.max_pending and not self._failing:
+            # The database is not keeping up: make this request wait for a flush
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._condition:
+                entries = list(self._pending)
+                self._pending.clear()
+            if not entries:
+                return 0
+            try:
+                self._insert([row for row, _ in entries])
+            except (DataError, IntegrityError):
+                # At least one row is bad; find it and write the rest
+                logger.warning("Batch of %d attempts was rejected, writing them one at a time", len(entries))
+                return self._insert_each(entries)
+            except Exception:
+                logger.exception("Failed to write %d attempts, will retry", len(entries))
+                self._requeue(entries)
+                return 0
+            self._failing = False
+            return len(entries)
+
+    def _insert_each(self, entries: List[list]) -> int:
+        written = 0
+        retry = []
+        for i, entry in enumerate(entries):
+            row, rejections = entry
+            try:
+                self._insert([row])
+            except (DataError, IntegrityError) as e:
+                entry[1] = rejections = rejections + 1
+                self.rejected += 1
+                if rejections >= self.max_retries:
+                    self.dropped += 1
+                    logger.error("Dropping attempt rejected %d times: %s (%s)", rejections, row, e.orig)
+                else:
+                    retry.append(entry)
+            except Exception:
+                logger.exception("Failed to write %d attempts, will retry", len(entries) - i)
+                self._requeue(retry + entries[i:])
+                return written
+            else:
+                written += 1
+        self._failing = False
+        if retry:
+            self.failed_flushes += 1
+            with self._condition:
+                self._pending.extendleft(reversed(retry))
+        return written
+
+    def _requeue(self, entries: List[list]) -> None:
+        self.failed_flushes += 1
+        self._failing = True
+        with self._condition:
+            self._pending.extendleft(reversed(entries))
+            # Rows added during the flush may have filled the queue again
+            overflow = len(self._pending) - self.max_queued
+            for _ in range(overflow):
+                self._pending.pop()
+        if overflow > 0:
+            self.dropped += overflow
+            logger.error("Attempt queue is full (%d rows), dropping %d attempts", self.max_queued, overflow)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "flush_size": self.flush_size,
+            "flush_interval": self.flush_interval,
+            "max_pending": self.max_pending,
+            "max_queued": self.max_queued,
+        }
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            # A list of parameter sets is sent as one executemany
+            db.execute(insert(Attempt), rows)
+            db.commit()
+        finally:
+            db.close()
+        self.written += len(rows)
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _run(self) -> None:
+        background_work.set(True)
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.flush_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            written = self.flush()
+            if stopping:
+                return
+            if not written and self._pending:
+                # The last flush failed; back off before retrying
+                time.sleep(self.flush_interval)
+
+
+attempt_writer = AttemptWriter(
+    mode=os.getenv("ATTEMPT_WRITE_MODE", "async"),
+    flush_size=int(os.getenv("ATTEMPT_FLUSH_SIZE", "500")),
+    flush_interval=float(os.getenv("ATTEMPT_FLUSH_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("ATTEMPT_MAX_PENDING", "50000")),
+    max_queued=int(os.getenv("ATTEMPT_MAX_QUEUED", "200000")),
+    max_retries=int(os.getenv("ATTEMPT_MAX_RETRIES", "3")),
+)
@@ -0,0 +1,356 @@
+import codecs
+import json
+import os
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.models.bulk import TestExport, TestImport
+from app.models.listening import Listening, ListeningCreate
+from app.models.reading import Reading, ReadingCreate
+from app.models.speaking import Speaking, SpeakingCreate
+from app.models.test import Test, TestResponse
+from app.models.writing import Writing, WritingCreate
+from app.profiling import profiled
+from app.services.search import search_backend
+from app.services.upload import upload_service
+
+# Tests inserted per transaction
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "50"))
+# Largest single record accepted, in characters of JSON
+IMPORT_MAX_RECORD_BYTES = int(os.getenv("IMPORT_MAX_RECORD_BYTES", str(8 * 1024 * 1024)))
+# Tests fetched per round trip while exporting, and bytes per streamed chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "100"))
+EXPORT_CHUNK_BYTES = 256 * 1024
+
+SECTIONS = {
+    "listening": (Listening, ListeningCreate),
+    "reading": (Reading, ReadingCreate),
+    "speaking": (Speaking, SpeakingCreate),
+    "writing": (Writing, WritingCreate),
+}
+
+
+class ImportParseError(Exception):
+    pass
+
+
+class RecordParser:
+    """
+    Incremental parser for a stream of JSON objects, either one per line
+    (NDJSON) or as a single JSON array. The format is picked from the first
+    character. Feed it text as it arrives; it returns the records completed
+    so far, with an ImportParseError in place of a record that is not valid
+    JSON.
+
+    A broken NDJSON line only loses that line. In an array the position of
+    the next record is unknown after an error, so parsing stops there.
+    """
+
+    def __init__(self, max_record_size: int):
+        self.max_record_size = max_record_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._array: Optional[bool] = None
+        self._expect_comma = False
+        self.finished = False
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        if self.finished:
+            return []
+        self._buffer += text
+        if self._array is None:
+            stripped = self._buffer.lstrip()
+            if not stripped:
+                return []
+            self._array = stripped[0] == "["
+            self._buffer = stripped[1:] if self._array else stripped
+        if self._array:
+            return self._feed_array(final)
+        return self._feed_lines(final)
+
+    def _feed_lines(self, final: bool) -> List[Any]:
+        lines = self._buffer.split("\n")
+        self._buffer = "" if final else lines.pop()
+        if len(self._buffer) > self.max_record_size:
+            self.finished = True
+            return [ImportParseError(f"Record is larger than {self.max_record_size} bytes")]
+        records = []
+        for line in lines:
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    records.append(ImportParseError(f"Invalid JSON: {e}"))
+        return records
+
+    def _feed_array(self, final: bool) -> List[Any]:
+        records = []
+        buffer = self._buffer
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                self.finished = True
+                break
+            if self._expect_comma:
+                if buffer[position] != ",":
+                    return self._fail(records, "Expected ',' or ']' between records")
+                self._expect_comma = False
+                position += 1
+                continue
+            # Only try to decode once the record could be complete
+            if buffer.find("}", position) == -1 and not final:
+                break
+            try:
+                record, position = self._decoder.raw_decode(buffer, position)
+            except ValueError as e:
+                if final or len(buffer) - position > self.max_record_size:
+                    return self._fail(records, f"Invalid JSON: {e}")
+                break
+            records.append(record)
+            self._expect_comma = True
+        self._buffer = buffer[position:]
+        if final and not self.finished:
+            return self._fail(records, "Unexpected end of JSON array")
+        return records
+
+    def _fail(self, records: List[Any], message: str) -> List[Any]:
+        self.finished = True
+        self._buffer = ""
+        records.append(ImportParseError(message))
+        return records
+
+
+class ImportFailed(Exception):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class PreparedTest(NamedTuple):
+    index: int
+    title: str
+    test: Dict[str, Any]
+    # Section name -> rows, usually one
+    sections: Dict[str, List[Dict[str, Any]]]
+
+
+def _validation_errors(error: ValidationError, prefix: str = "") -> List[str]:
+    return [
+        f"{prefix}{'.'.join(str(part) for part in e['loc']) or '(record)'}: {e['msg']}"
+        for e in error.errors()
+    ]
+
+
+def _prepare(index: int, data: Any) -> PreparedTest:
+    if isinstance(data, ImportParseError):
+        raise ImportFailed([str(data)])
+    try:
+        record = TestImport.model_validate(data)
+    except ValidationError as e:
+        raise ImportFailed(_validation_errors(e))
+
+    errors = []
+    extra = record.extra_sections or {}
+    unknown = sorted(set(extra) - set(SECTIONS))
+    if unknown:
+        errors.append(f"extra_sections: unknown sections {', '.join(unknown)}")
+    sections = {}
+    for name, (_, create_schema) in SECTIONS.items():
+        payloads = [(name, getattr(record, name))] if getattr(record, name) is not None else []
+        payloads += [(f"extra_sections.{name}.{i}", payload) for i, payload in enumerate(extra.get(name, []))]
+        for prefix, payload in payloads:
+            try:
+                # test_id is filled in after the test row is inserted
+                section: BaseModel = create_schema.model_validate({**payload, "test_id": 0})
+            except ValidationError as e:
+                errors.extend(_validation_errors(e, prefix=f"{prefix}."))
+                continue
+            sections.setdefault(name, []).append(section.model_dump(exclude={"test_id"}))
+    if errors:
+        raise ImportFailed(errors)
+
+    test = record.model_dump(include=set(TestImport.model_fields) - set(SECTIONS) - {"extra_sections"})
+    test["image_variants"] = upload_service.image_variants(record.image)
+    for writing in sections.get("writing", []):
+        writing["task_1_image_variants"] = upload_service.image_variants(writing["task_1_image_url"])
+        writing["task_2_image_variants"] = upload_service.image_variants(writing["task_2_image_url"])
+    return PreparedTest(index, record.title, test, sections)
+
+
+def _insert(db, records: List[PreparedTest]) -> List[int]:
+    # One multi-row INSERT per table; ids come back in input order
+    test_ids = db.execute(
+        insert(Test).returning(Test.id, sort_by_parameter_order=True),
+        [record.test for record in records],
+    ).scalars().all()
+    for name, (model, _) in SECTIONS.items():
+        rows = [
+            {**section, "test_id": test_id}
+            for record, test_id in zip(records, test_ids)
+            for section in record.sections.get(name, [])
+        ]
+        if rows:
+            db.execute(insert(model), rows)
+    return list(test_ids)
+
+
+@profiled
+def import_batch(batch: List[Tuple[int, Any]]) -> Tuple[List[int], List[Dict]]:
+    """
+    Validate and insert one chunk of records in a single transaction.
+
+    If the transaction fails, each valid record is retried in a transaction
+    of its own, so one bad row only fails its own record.
+    """
+    prepared = []
+    errors = []
+    for index, data in batch:
+        try:
+            prepared.append(_prepare(index, data))
+        except ImportFailed as e:
+            title = data.get("title") if isinstance(data, dict) else None
+            errors.append({"index": index, "title": title, "errors": e.errors})
+
+    test_ids = []
+    if prepared:
+        with SessionLocal() as db:
+            try:
+                test_ids = _insert(db, prepared)
+                db.commit()
+            except SQLAlchemyError:
+                db.rollback()
+                # Ids returned before a failed commit were rolled back
+                test_ids = []
+                for record in prepared:
+                    try:
+                        ids = _insert(db, [record])
+                        db.commit()
+                    except SQLAlchemyError as e:
+                        db.rollback()
+                        errors.append({
+                            "index": record.index,
+                            "title": record.title,
+                            "errors": [str(getattr(e, "orig", None) or e)],
+                        })
+                    else:
+                        test_ids.extend(ids)
+        if test_ids:
+            # Core inserts skip the ORM events the in-memory index listens to
+            search_backend.mark_dirty()
+    return test_ids, errors
+
+
+async def import_tests(chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """
+    Import complete tests from a byte stream of NDJSON or a JSON array.
+    Records are parsed as the bytes arrive and inserted IMPORT_BATCH_SIZE at
+    a time in the thread pool, so the whole payload is never held in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = RecordParser(IMPORT_MAX_RECORD_BYTES)
+    test_ids: List[int] = []
+    errors: List[Dict] = []
+    batch: List[Tuple[int, Any]] = []
+    index = 0
+
+    async def flush():
+        ids, failed = await run_in_threadpool(import_batch, batch[:])
+        test_ids.extend(ids)
+        errors.extend(failed)
+        batch.clear()
+
+    async def feed(text: str, final: bool = False):
+        nonlocal index
+        for record in parser.feed(text, final=final):
+            batch.append((index, record))
+            index += 1
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+
+    async for chunk in chunks:
+        await feed(decoder.decode(chunk))
+        if parser.finished:
+            break
+    await feed(decoder.decode(b"", final=True), final=True)
+    if batch:
+        await flush()
+
+    errors.sort(key=lambda error: error["index"])
+    return {
+        "imported": len(test_ids),
+        "failed": len(errors),
+        "test_ids": test_ids,
+        "errors": errors,
+    }
+
+
+def export_tests(compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Every test with its sections as NDJSON, gzip-compressed if `compress`.
+
+    Rows are fetched `batch_size` at a time through a server-side cursor
+    and written out in chunks of about EXPORT_CHUNK_BYTES, so memory use
+    does not grow with the size of the catalog. Runs in the thread pool
+    when handed to a StreamingResponse.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    db = SessionLocal()
+    try:
+        tests = db.execute(
+            select(Test).order_by(Test.id).execution_options(yield_per=batch_size)
+        ).scalars()
+        buffer = bytearray()
+        for batch in tests.partitions():
+            # Sections are fetched per batch rather than joined, so tests
+            # with several rows of one section keep all of them, and rather
+            # than loaded through the relationships, which would link each
+            # test and its sections into reference cycles that outlive the
+            # batch
+            test_ids = [test.id for test in batch]
+            rows: Dict[str, Dict[int, list]] = {}
+            for name, (model, _) in SECTIONS.items():
+                found = rows[name] = {}
+                query = db.query(model).filter(model.test_id.in_(test_ids)).order_by(model.test_id, model.id)
+                for section in query:
+                    found.setdefault(section.test_id, []).append(section)
+
+            for test in batch:
+                record = {name: getattr(test, name) for name in TestResponse.model_fields}
+                extra = {}
+                for name in SECTIONS:
+                    first, *others = rows[name].get(test.id) or [None]
+                    record[name] = first
+                    if others:
+                        extra[name] = others
+                if extra:
+                    record["extra_sections"] = extra
+                buffer += TestExport.model_validate(record, from_attributes=True).model_dump_json().encode()
+                buffer += b"\n"
+                if len(buffer) >= EXPORT_CHUNK_BYTES:
+                    chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                    buffer.clear()
+                    if chunk:
+                        yield chunk
+            for instance in batch:
+                db.expunge(instance)
+            for found in rows.values():
+                for sections in found.values():
+                    for section in sections:
+                        db.expunge(section)
+        chunk = bytes(buffer)
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+    finally:
+        db.close()
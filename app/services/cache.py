@@ -0,0 +1,141 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from app.etag import compute_etag
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class ContentCache:
+    """
+    Bounded LRU cache with a TTL for serialized test content.
+
+    Entries are the JSON bodies of GET responses with their ETags, so a hit
+    skips the database and serialization, and a conditional GET can be
+    answered from the ETag alone. The cache is capped by entry count and by the
+    total size of the bodies. It is per process: other workers only see a
+    write once their own entry expires, so the TTL bounds cross-worker staleness.
+
+    A miss reads the key's generation before loading the row and passes it
+    to put(). invalidate() bumps the generation, so a body loaded before a
+    concurrent write committed is returned but not cached.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self._bytes = 0
+        # Invalidations per key; one int for every key ever written to
+        self._generations: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            cached, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def generation(self, key: Hashable) -> int:
+        """Read before loading the value of a missed key, and pass it to put()."""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def put(self, key: Hashable, value: BaseModel, generation: int) -> CachedBody:
+        body = value.model_dump_json().encode()
+        cached = CachedBody(body, compute_etag(body))
+        if len(body) > self.max_bytes:
+            return cached
+
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                # Written since the value was loaded; it may be stale
+                self.stale_puts += 1
+                return cached
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (cached, time.monotonic() + self.ttl_seconds)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return cached
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                # Also for keys not cached, which a miss may be loading
+                self._generations[key] = self._generations.get(key, 0) + 1
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def invalidate_section(self, section: str, section_id: int, test_id: int) -> None:
+        self.invalidate(
+            (section, "id", section_id),
+            (section, "test", test_id),
+            ("tests", "full", test_id),
+        )
+
+    def invalidate_test(self, test_id: int) -> None:
+        self.invalidate(("tests", "id", test_id), ("tests", "full", test_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        cached, _ = self._entries.pop(key)
+        self._bytes -= len(cached.body)
+
+
+content_cache = ContentCache(
+    max_entries=int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("CONTENT_CACHE_TTL", "300")),
+)
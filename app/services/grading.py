@@ -0,0 +1,280 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import AsyncIterator, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.profiling import profiled
+from app.services.attempts import attempt_writer
+
+# Several accepted answers are written "colour | color" or "colour / color",
+# and optional words in brackets: "(the) library"
+_ALTERNATIVE_SPLIT = re.compile(r"\s*\|\s*|\s+/\s+")
+_OPTIONAL_WORDS = re.compile(r"\(([^)]*)\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Spellings of NOT GIVEN in answer keys
+KEY_SYNONYMS = {
+    "ng": "not given",
+    "notgiven": "not given",
+    "not-given": "not given",
+}
+# Short forms students may write for TRUE/FALSE/NOT GIVEN and YES/NO/NOT
+# GIVEN answers. Only accepted when the key is one of these answers, so a
+# multiple-choice key of "F" does not accept "false".
+JUDGEMENT_FORMS = {
+    "true": ("t",),
+    "false": ("f",),
+    "yes": ("y",),
+    "no": ("n",),
+    "not given": ("ng", "notgiven", "not-given"),
+}
+
+# Batches up to this size are graded in-process; larger ones are split into
+# chunks and spread over a process pool
+GRADING_INLINE_LIMIT = int(os.getenv("GRADING_INLINE_LIMIT", "500"))
+GRADING_CHUNK_SIZE = int(os.getenv("GRADING_CHUNK_SIZE", "1000"))
+GRADING_PROCESSES = int(os.getenv("GRADING_PROCESSES", "0")) or os.cpu_count()
+
+# Lowest raw score (out of 40) needed for each band, highest band first
+LISTENING_BANDS = [
+    (39, 9.0), (37, 8.5), (35, 8.0), (32, 7.5), (30, 7.0), (26, 6.5), (23, 6.0),
+    (18, 5.5), (16, 5.0), (13, 4.5), (10, 4.0), (8, 3.5), (6, 3.0), (4, 2.5),
+    (2, 2.0), (1, 1.0), (0, 0.0),
+]
+READING_BANDS = [
+    (39, 9.0), (37, 8.5), (35, 8.0), (33, 7.5), (30, 7.0), (27, 6.5), (23, 6.0),
+    (19, 5.5), (15, 5.0), (13, 4.5), (10, 4.0), (8, 3.5), (6, 3.0), (4, 2.5),
+    (2, 2.0), (1, 1.0), (0, 0.0),
+]
+
+
+def _band_table(thresholds: List[Tuple[int, float]]) -> List[float]:
+    table = []
+    for raw in range(41):
+        table.append(next(band for minimum, band in thresholds if raw >= minimum))
+    return table
+
+
+BAND_TABLES = {
+    "listening": _band_table(LISTENING_BANDS),
+    "reading": _band_table(READING_BANDS),
+}
+
+
+def normalize(answer: str) -> str:
+    return _WHITESPACE.sub(" ", str(answer).casefold()).strip(" .,;:!?\"'")
+
+
+def _expand(answer: str) -> List[str]:
+    """Accepted spellings of one answer, with and without any bracketed words."""
+    with_optional = _OPTIONAL_WORDS.sub(r"\1", answer)
+    without_optional = _OPTIONAL_WORDS.sub("", answer)
+    return [with_optional, without_optional]
+
+
+def compile_sheet(sheet: Dict) -> Dict[int, FrozenSet[str]]:
+    compiled = {}
+    for question, answer in sheet.items():
+        accepted = set()
+        for alternative in _ALTERNATIVE_SPLIT.split(str(answer)):
+            for form in _expand(alternative):
+                form = normalize(form)
+                form = KEY_SYNONYMS.get(form, form)
+                accepted.add(form)
+                accepted.update(JUDGEMENT_FORMS.get(form, ()))
+        accepted.discard("")
+        compiled[int(question)] = frozenset(accepted)
+    return compiled
+
+
+class CompiledKey:
+    """Answer sheets of one section, normalized for constant-time lookups."""
+
+    def __init__(self, section: str, sheets: List[Dict], section_id: Optional[int] = None, test_id: Optional[int] = None):
+        self.section = section
+        self.section_id = section_id
+        self.test_id = test_id
+        self.parts = [compile_sheet(sheet or {}) for sheet in sheets]
+        self.total = sum(len(part) for part in self.parts)
+
+    def band(self, correct: int) -> float:
+        if not self.total:
+            return 0.0
+        # Sections with fewer or more than 40 questions are scaled onto the 40-point table
+        raw = min(40, round(correct * 40 / self.total))
+        return BAND_TABLES[self.section][raw]
+
+    def grade(self, answers: Dict[int, Dict[int, str]]) -> Dict:
+        parts = []
+        correct = 0
+        for number, key in enumerate(self.parts, start=1):
+            submitted = answers.get(number) or {}
+            results = {}
+            for question, accepted in key.items():
+                given = submitted.get(question)
+                results[question] = given is not None and normalize(given) in accepted
+            part_correct = sum(results.values())
+            correct += part_correct
+            parts.append({
+                "part": number,
+                "correct": part_correct,
+                "total": len(key),
+                "results": results,
+            })
+        return {
+            "correct": correct,
+            "total": self.total,
+            "band": self.band(correct),
+            "parts": parts,
+        }
+
+
+class AnswerKeyCache:
+    """Compiled answer keys by (section, id), dropped on update and after a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[CompiledKey, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, section: str, section_id: int) -> Optional[CompiledKey]:
+        key = (section, section_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            compiled, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return compiled
+
+    def put(self, section_id: int, compiled: CompiledKey) -> CompiledKey:
+        with self._lock:
+            self._entries[(compiled.section, section_id)] = (compiled, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end((compiled.section, section_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, section: str, section_id: int) -> None:
+        with self._lock:
+            self._entries.pop((section, section_id), None)
+
+
+answer_keys = AnswerKeyCache(
+    max_entries=int(os.getenv("ANSWER_KEY_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("CONTENT_CACHE_TTL", "300")),
+)
+
+
+def load_answer_key(db, model, section: str, section_id: int) -> Optional[CompiledKey]:
+    """Compiled key for a Reading or Listening row, loading only its answer sheets on a miss."""
+    compiled = answer_keys.get(section, section_id)
+    if compiled is not None:
+        return compiled
+
+    columns = [model.test_id, model.answer_sheet1, model.answer_sheet2, model.answer_sheet3, model.answer_sheet4]
+    row = db.query(*columns).filter(model.id == section_id).first()
+    if row is None:
+        return None
+    test_id, *sheets = row
+    return answer_keys.put(section_id, CompiledKey(section, sheets, section_id=section_id, test_id=test_id))
+
+
+def record_attempts(compiled: CompiledKey, graded: List[Tuple[Optional[str], Dict, Dict]]) -> None:
+    """Queue an attempt row for every (student_id, answers, result) with a student id."""
+    attempt_writer.add_many([
+        {
+            "test_id": compiled.test_id,
+            "section": compiled.section,
+            "section_id": compiled.section_id,
+            "student_id": student_id,
+            "answers": answers,
+            "correct": result["correct"],
+            "total": result["total"],
+            "band": result["band"],
+        }
+        for student_id, answers, result in graded
+        if student_id is not None
+    ])
+
+
+def grade_chunk(compiled: CompiledKey, submissions: List[Tuple[int, Optional[str], Dict]]) -> Tuple[bytes, List[Dict]]:
+    """
+    NDJSON lines for (index, student_id, answers) submissions, plus the
+    results of the ones with a student id. Runs in worker processes.
+    """
+    lines = []
+    scored = []
+    for index, student_id, answers in submissions:
+        result = compiled.grade(answers)
+        lines.append(json.dumps({"index": index, "student_id": student_id, **result}))
+        if student_id is not None:
+            scored.append({"index": index, "correct": result["correct"], "total": result["total"], "band": result["band"]})
+    body = ("\n".join(lines) + "\n").encode() if lines else b""
+    return body, scored
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=GRADING_PROCESSES)
+        return _process_pool
+
+
+def shutdown_grading_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+@profiled
+def _record_chunk(compiled: CompiledKey, submissions: List[Tuple[int, Optional[str], Dict]], scored: List[Dict]) -> None:
+    record_attempts(compiled, [
+        (submissions[result["index"]][1], submissions[result["index"]][2], result)
+        for result in scored
+    ])
+
+
+async def grade_batch(compiled: CompiledKey, submissions: List[Tuple[int, Optional[str], Dict]]) -> AsyncIterator[bytes]:
+    """
+    Grade many submissions against one key, yielding NDJSON in submission
+    order. Submissions with a student id are recorded as attempts.
+    """
+    if len(submissions) <= GRADING_INLINE_LIMIT:
+        body, scored = grade_chunk(compiled, submissions)
+        await run_in_threadpool(_record_chunk, compiled, submissions, scored)
+        yield body
+        return
+
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    futures = [
+        loop.run_in_executor(pool, grade_chunk, compiled, submissions[start:start + GRADING_CHUNK_SIZE])
+        for start in range(0, len(submissions), GRADING_CHUNK_SIZE)
+    ]
+    try:
+        for future in futures:
+            body, scored = await future
+            await run_in_threadpool(_record_chunk, compiled, submissions, scored)
+            yield body
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Largest image, in pixels, that is decoded at all. Pillow's own check only
+# raises above twice its limit, so sizes are also checked explicitly.
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+IMAGE_PROCESSES = int(os.getenv("IMAGE_PROCESSES", "2"))
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+# Variant name -> longest side in pixels. Images are only ever scaled down.
+VARIANTS = {
+    "thumbnail": 200,
+    "card": 600,
+    "full": 1600,
+}
+# Format -> (Pillow format, file extension, content type, save options)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+def check_dimensions(width: int, height: int) -> None:
+    if width * height > IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(f"Image dimensions exceed the {IMAGE_MAX_PIXELS} pixel limit")
+
+
+def variant_path(folder: str, sha256: str, variant: str, fmt: str) -> str:
+    return f"{folder}/{sha256}/{variant}.{VARIANT_FORMATS[fmt][1]}"
+
+
+def render_variants(source: str, out_dir: str) -> List[Tuple[str, str, str, str]]:
+    """
+    Write every variant of the image at `source` into `out_dir`.
+
+    Runs in a worker process. Returns (variant, format, path, content type)
+    for each file written.
+    """
+    rendered = []
+    with Image.open(source) as image:
+        check_dimensions(*image.size)
+        largest = max(VARIANTS.values())
+        # JPEGs can be decoded at a reduced scale, which is much cheaper
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.mode else "RGB")
+
+        # Largest first, so each smaller variant is resized from the previous one
+        for variant, side in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+            image.thumbnail((side, side), Image.Resampling.LANCZOS)
+            flat = image
+            if image.mode == "RGBA":
+                flat = Image.new("RGB", image.size, (255, 255, 255))
+                flat.paste(image, mask=image.getchannel("A"))
+            for fmt, (pil_format, extension, content_type, options) in VARIANT_FORMATS.items():
+                path = os.path.join(out_dir, f"{variant}.{extension}")
+                (image if pil_format == "WEBP" else flat).save(path, pil_format, **options)
+                rendered.append((variant, fmt, path, content_type))
+    return rendered
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=IMAGE_PROCESSES)
+        return _process_pool
+
+
+def shutdown_image_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+async def generate_variants(source: str, out_dir: str) -> List[Tuple[str, str, str, str]]:
+    """Render the variants in the process pool, keeping the event loop free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), render_variants, source, out_dir)
+
+
+def variant_urls(public_url, folder: str, sha256: str) -> Dict[str, Dict[str, str]]:
+    return {
+        variant: {fmt: public_url(variant_path(folder, sha256, variant, fmt)) for fmt in VARIANT_FORMATS}
+        for variant in VARIANTS
+    }
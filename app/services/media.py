@@ -0,0 +1,184 @@
+import asyncio
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.storage import StorageBackend, StorageError
+from app.services.upload import upload_service
+
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ieltsly-media")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Partial downloads older than this are left over from a crash. Younger ones
+# may belong to another worker sharing the directory.
+MEDIA_PARTIAL_MAX_AGE = int(os.getenv("MEDIA_PARTIAL_MAX_AGE", "3600"))
+
+
+class MediaCache:
+    """
+    LRU cache of stored objects on the local disk, capped by total size.
+
+    A miss downloads the whole object once, however many requests are
+    waiting for it, and the file is then served from disk so the server can
+    send it without copying it through Python. Backends that already keep
+    files locally are served directly and never cached. Files left in the
+    directory by a previous run are picked up by load().
+    """
+
+    def __init__(self, storage: StorageBackend, directory: str, max_bytes: int):
+        self.storage = storage
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = Lock()
+        self._downloads: Dict[str, asyncio.Lock] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self) -> None:
+        """
+        Index the files already in the directory, least recently read first,
+        and remove stale partial downloads. Other workers may be writing to
+        and evicting from the same directory meanwhile.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        stale = time.time() - MEDIA_PARTIAL_MAX_AGE
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    if name.startswith(".partial-"):
+                        if stat.st_mtime < stale:
+                            os.unlink(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_atime, os.path.relpath(path, self.directory), stat.st_size))
+        with self._lock:
+            for _, object_path, size in sorted(files):
+                if object_path not in self._entries:
+                    self._entries[object_path] = size
+                    self._bytes += size
+            self._evict()
+
+    @staticmethod
+    def _outside(object_path: str) -> bool:
+        return object_path.startswith("/") or ".." in object_path.split("/")
+
+    def _cache_path(self, object_path: str) -> str:
+        return os.path.join(self.directory, object_path)
+
+    def _lookup(self, object_path: str) -> Optional[str]:
+        with self._lock:
+            if object_path not in self._entries:
+                return None
+            path = self._cache_path(object_path)
+            if not os.path.isfile(path):
+                self._bytes -= self._entries.pop(object_path)
+                return None
+            self._entries.move_to_end(object_path)
+            self.hits += 1
+            return path
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            object_path, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                # Responses already streaming the file keep their open handle
+                os.unlink(self._cache_path(object_path))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, object_path: str) -> Tuple[str, bool]:
+        """
+        Local path of the object, downloading it on a miss. The flag is True
+        when the file is temporary (too big for the cache) and must be
+        removed once it has been sent. Raises StorageError if missing.
+        """
+        if self._outside(object_path):
+            raise StorageError(f"Object not found: {object_path}", status_code=404)
+        local = self.storage.local_path(object_path)
+        if local is not None:
+            return local, False
+
+        path = self._lookup(object_path)
+        if path is not None:
+            return path, False
+
+        lock = self._downloads.setdefault(object_path, asyncio.Lock())
+        async with lock:
+            # Another request may have fetched it while this one waited
+            path = self._lookup(object_path)
+            if path is not None:
+                return path, False
+            with self._lock:
+                self.misses += 1
+
+            target = self._cache_path(object_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, partial = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".partial-")
+            os.close(fd)
+            try:
+                await self.storage.download(object_path, partial)
+            except BaseException:
+                os.unlink(partial)
+                raise
+            finally:
+                self._downloads.pop(object_path, None)
+
+            size = os.path.getsize(partial)
+            if size > self.max_bytes:
+                return partial, True
+            os.replace(partial, target)
+            with self._lock:
+                self._entries[object_path] = size
+                self._bytes += size
+                self._evict()
+            return target, False
+
+    def invalidate(self, object_path: str) -> None:
+        """Remove a deleted object from the cache of every worker on this host."""
+        if self._outside(object_path):
+            return
+        with self._lock:
+            size = self._entries.pop(object_path, None)
+            if size is not None:
+                self._bytes -= size
+        try:
+            # Other workers sharing the directory notice the file is gone on
+            # their next lookup
+            os.unlink(self._cache_path(object_path))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self.max_bytes, max_bytes = 0, self.max_bytes
+            self._evict()
+            self.max_bytes = max_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+media_cache = MediaCache(upload_service.storage, MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException
+
+from app.services.storage import StorageError
+from app.services.upload import CHUNK_SIZE, UploadService, sniff_content_type, upload_service
+
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR") or os.path.join(tempfile.gettempdir(), "ieltsly-uploads")
+# Sessions without a chunk for this many seconds are removed
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+UPLOAD_SESSION_GC_INTERVAL = float(os.getenv("UPLOAD_SESSION_GC_INTERVAL", "600"))
+
+HEADER_SIZE = 64
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ResumableUploads:
+    """
+    Chunked uploads that survive dropped connections.
+
+    A session is a `.part` file that chunks are appended to and a `.json`
+    file with what was declared when it was created, both in `directory`.
+    The number of bytes received is the size of the `.part` file, so any
+    worker on the same host can continue a session. The SHA-256 is updated
+    as chunks arrive, so completing an upload does not read the file again
+    unless the session moved to another worker.
+    """
+
+    def __init__(self, service: UploadService, directory: str, ttl_seconds: float, gc_interval: float):
+        self.service = service
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.gc_interval = gc_interval
+        # session id -> (bytes hashed, running SHA-256)
+        self._hashes: Dict[str, Tuple[int, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._gc_task: Optional[asyncio.Task] = None
+
+    def _paths(self, session_id: str) -> Tuple[str, str]:
+        if not _SESSION_ID.match(session_id):
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        base = os.path.join(self.directory, session_id)
+        return base + ".part", base + ".json"
+
+    def _load(self, session_id: str) -> Dict[str, Any]:
+        part_path, meta_path = self._paths(session_id)
+        try:
+            with open(meta_path) as f:
+                session = json.load(f)
+            session["offset"] = os.path.getsize(part_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        return session
+
+    def _discard(self, session_id: str) -> None:
+        self._hashes.pop(session_id, None)
+        self._locks.pop(session_id, None)
+        for path in self._paths(session_id):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _view(self, session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "session_id": session_id,
+            "filename": session["filename"],
+            "content_type": session["content_type"],
+            "size": session["size"],
+            "offset": session["offset"],
+            "expires_at": os.path.getmtime(self._paths(session_id)[0]) + self.ttl_seconds,
+        }
+
+    def create(self, file_type: str, folder: str, filename: str, size: int, content_type: str) -> Dict[str, Any]:
+        max_size_mb = self.service.check_upload(file_type, content_type)
+        if size > max_size_mb * 1024 * 1024:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds {max_size_mb}MB limit"
+            )
+
+        os.makedirs(self.directory, exist_ok=True)
+        session_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(session_id)
+        open(part_path, "wb").close()
+        session = {
+            "file_type": file_type,
+            "folder": folder,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "created_at": time.time(),
+        }
+        with open(meta_path, "w") as f:
+            json.dump(session, f)
+        self._hashes[session_id] = (0, hashlib.sha256())
+        return self._view(session_id, {**session, "offset": 0})
+
+    def status(self, session_id: str) -> Dict[str, Any]:
+        return self._view(session_id, self._load(session_id))
+
+    async def _running_hash(self, session_id: str, part_path: str, offset: int):
+        hashed, digest = self._hashes.get(session_id, (0, None))
+        if digest is not None and hashed == offset:
+            # A copy, so a chunk that fails half way leaves the saved state alone
+            return digest.copy()
+        # The earlier chunks went to another worker, or it restarted
+        digest = hashlib.sha256()
+        async with await anyio.open_file(part_path, "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return digest
+
+    async def append(self, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Append a chunk that starts at `offset`. A chunk for any other offset
+        is refused with 409 and the offset to resume from.
+        """
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            session = self._load(session_id)
+            part_path, _ = self._paths(session_id)
+            if offset != session["offset"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Chunk starts at {offset}, expected offset {session['offset']}",
+                    headers={"Upload-Offset": str(session["offset"])},
+                )
+
+            digest = await self._running_hash(session_id, part_path, offset)
+            received = offset
+            async with await anyio.open_file(part_path, "ab") as f:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > session["size"]:
+                        # Drop the partial chunk, so the client can resend it
+                        await f.truncate(offset)
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Chunk extends past the declared size of {session['size']} bytes"
+                        )
+                    await f.write(chunk)
+                    digest.update(chunk)
+            self._hashes[session_id] = (received, digest)
+
+            # Check the format as soon as the first bytes are in, instead of
+            # after the whole file has been sent
+            if offset < HEADER_SIZE and (received >= HEADER_SIZE or received == session["size"]):
+                header = await self._header(part_path)
+                if sniff_content_type(header, session["file_type"]) is None:
+                    self._discard(session_id)
+                    raise HTTPException(
+                        status_code=400,
+                        detail="File content does not match an allowed format"
+                    )
+
+            session["offset"] = received
+            return self._view(session_id, session)
+
+    @staticmethod
+    async def _header(part_path: str) -> bytes:
+        async with await anyio.open_file(part_path, "rb") as f:
+            return await f.read(HEADER_SIZE)
+
+    async def complete(self, session_id: str) -> Dict[str, Any]:
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            session = self._load(session_id)
+            part_path, _ = self._paths(session_id)
+            if session["offset"] != session["size"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Upload incomplete: {session['offset']} of {session['size']} bytes received",
+                    headers={"Upload-Offset": str(session["offset"])},
+                )
+            digest = await self._running_hash(session_id, part_path, session["offset"])
+            header = await self._header(part_path)
+            try:
+                result = await self.service.store_file(
+                    part_path, session["size"], header, digest.hexdigest(),
+                    session["file_type"], session["folder"],
+                )
+            except StorageError as e:
+                # The session is kept, so completing can be retried
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Upload failed: {str(e)}"
+                )
+            except HTTPException as e:
+                if e.status_code == 400:
+                    self._discard(session_id)
+                raise
+            self._discard(session_id)
+            return {**result, "original_filename": session["filename"]}
+
+    def cancel(self, session_id: str) -> None:
+        self._load(session_id)
+        self._discard(session_id)
+
+    def collect_garbage(self) -> int:
+        """Remove sessions that have not received a chunk within the TTL."""
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.directory):
+            session_id, extension = os.path.splitext(name)
+            if extension != ".part" or not _SESSION_ID.match(session_id):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.directory, name)) < cutoff:
+                    self._discard(session_id)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    async def _gc_loop(self) -> None:
+        while True:
+            await anyio.to_thread.run_sync(self.collect_garbage)
+            await asyncio.sleep(self.gc_interval)
+
+    def start(self) -> None:
+        if self._gc_task is None:
+            self._gc_task = asyncio.get_running_loop().create_task(self._gc_loop())
+
+    async def stop(self) -> None:
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            self._gc_task = None
+
+
+resumable_uploads = ResumableUploads(
+    upload_service,
+    directory=UPLOAD_SESSION_DIR,
+    ttl_seconds=UPLOAD_SESSION_TTL,
+    gc_interval=UPLOAD_SESSION_GC_INTERVAL,
+)
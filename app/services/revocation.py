@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Optional
+
+import anyio
+from sqlalchemy import delete
+
+from app.database import SessionLocal, background_work
+from app.models.token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# "database" shares revocations between workers, "memory" keeps them per process
+TOKEN_REVOCATION_BACKEND = os.getenv("TOKEN_REVOCATION_BACKEND") or "database"
+# Seconds between reloads of the revocation list from the database
+TOKEN_REVOCATION_REFRESH = float(os.getenv("TOKEN_REVOCATION_REFRESH", "5"))
+
+
+class RevocationStore:
+    """
+    Set of revoked token ids, checked on every authenticated request.
+
+    Lookups only read a dict in this process. An entry is kept until the
+    token it revokes would have expired, after which the token is refused
+    on its `exp` claim anyway.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        # jti -> expiry of the revoked token (epoch seconds)
+        self._revoked: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        self.purge()
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def purge(self) -> int:
+        """Forget revocations of tokens that have expired."""
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+            for jti in expired:
+                del self._revoked[jti]
+        return len(expired)
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "revoked": len(self._revoked)}
+
+
+class DatabaseRevocationStore(RevocationStore):
+    """
+    Revocations stored in the ielts_revoked_tokens table.
+
+    Each worker keeps a copy of the table in memory and reloads it every
+    `refresh_interval` seconds in the background, so a revocation made on
+    another worker applies there within that interval. Expired rows are
+    deleted on reload.
+    """
+
+    name = "database"
+
+    def __init__(self, refresh_interval: float):
+        super().__init__()
+        self.refresh_interval = refresh_interval
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        with SessionLocal() as db:
+            # merge, so revoking the same token twice is not an error
+            db.merge(RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(expires_at)))
+            db.commit()
+        super().revoke(jti, expires_at)
+
+    def refresh(self) -> None:
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+            rows = db.query(RevokedToken.jti, RevokedToken.expires_at).all()
+            db.commit()
+        revoked = {jti: (expires_at - datetime(1970, 1, 1)).total_seconds() for jti, expires_at in rows}
+        with self._lock:
+            self._revoked = revoked
+        self.refreshes += 1
+
+    async def _refresh_loop(self) -> None:
+        # Copied into the worker threads that run refresh()
+        background_work.set(True)
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.refresh)
+            except Exception:
+                # Keep the last copy; revocations made elsewhere arrive late
+                self.failed_refreshes += 1
+                logger.exception("Failed to reload revoked tokens")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "refresh_interval": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+        }
+
+
+def create_revocation_store() -> RevocationStore:
+    if TOKEN_REVOCATION_BACKEND == "memory":
+        return RevocationStore()
+    if TOKEN_REVOCATION_BACKEND == "database":
+        return DatabaseRevocationStore(TOKEN_REVOCATION_REFRESH)
+    raise ValueError(f"Unknown TOKEN_REVOCATION_BACKEND: {TOKEN_REVOCATION_BACKEND}")
+
+
+revocation_store = create_revocation_store()
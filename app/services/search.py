@@ -0,0 +1,222 @@
+import html
+import math
+import re
+from collections import Counter, defaultdict
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event, func, literal, literal_column, select, union_all
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models.listening import Listening
+from app.models.reading import Reading
+from app.models.writing import Writing
+
+SEARCH_CONFIG = "english"
+MARK_START = "<mark>"
+MARK_STOP = "</mark>"
+
+# Searchable sections and the text columns that make up their documents
+SEARCH_SECTIONS = {
+    "reading": (Reading, ["text1", "text2", "text3", "text4"]),
+    "listening": (Listening, ["text1", "text2", "text3", "text4"]),
+    "writing": (Writing, ["task_1_text", "task_2_text"]),
+}
+
+
+def _document_sql(columns: List[str]) -> str:
+    return " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+
+
+class PostgresSearch:
+    """
+    Ranked search over the generated tsvector columns.
+
+    Each searchable table has a `search_vector` column with a GIN index,
+    added by migration 0002. The column is not mapped on the models, so
+    normal queries never load it.
+    """
+
+    def mark_dirty(self, *args) -> None:
+        # Generated columns follow every write, including bulk inserts
+        pass
+
+    def search(self, db: Session, query: str, sections: List[str], limit: int, offset: int) -> List[Dict]:
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        ranked = []
+        for section in sections:
+            model, columns = SEARCH_SECTIONS[section]
+            search_vector = literal_column(f"{model.__tablename__}.search_vector")
+            ranked.append(
+                select(
+                    literal(section).label("section"),
+                    model.id.label("id"),
+                    model.test_id.label("test_id"),
+                    func.ts_rank_cd(search_vector, tsquery).label("rank"),
+                ).where(search_vector.op("@@")(tsquery))
+            )
+        page = (
+            union_all(*ranked).subquery()
+            if len(ranked) > 1 else ranked[0].subquery()
+        )
+        rows = db.execute(
+            select(page).order_by(page.c.rank.desc(), page.c.section, page.c.id).limit(limit).offset(offset)
+        ).all()
+
+        # ts_headline re-parses the documents, so it only runs for the page,
+        # with one query per section
+        page_ids = defaultdict(list)
+        for row in rows:
+            page_ids[row.section].append(row.id)
+        snippets = {}
+        for section, ids in page_ids.items():
+            model, columns = SEARCH_SECTIONS[section]
+            document = literal_column(_document_sql([f"{model.__tablename__}.{c}" for c in columns]))
+            headlines = db.execute(
+                select(model.id, func.ts_headline(
+                    SEARCH_CONFIG, document, tsquery,
+                    f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxFragments=2, MaxWords=25, MinWords=8",
+                )).where(model.id.in_(ids))
+            )
+            snippets.update({(section, section_id): snippet for section_id, snippet in headlines})
+
+        return [
+            {
+                "section": row.section,
+                "id": row.id,
+                "test_id": row.test_id,
+                "rank": float(row.rank),
+                "snippet": snippets.get((row.section, row.id), ""),
+            }
+            for row in rows
+        ]
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the "
+    "their there this to was were which will with".split()
+)
+
+
+def _stem(token: str) -> str:
+    # Enough folding for dev searches to match plurals and simple verb forms
+    for suffix in ("ing", "es", "ed", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class InMemorySearch:
+    """
+    Inverted index used when the database is not Postgres (SQLite dev and
+    test setups). It is built from the database on first use and rebuilt
+    after any write to a searchable table.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._dirty = True
+        self._postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._documents: Dict[Tuple[str, int], Tuple[int, str]] = {}
+
+    def mark_dirty(self, *args) -> None:
+        self._dirty = True
+
+    def _build(self, db: Session) -> None:
+        postings: Dict[str, Dict[Tuple[str, int], int]] = defaultdict(dict)
+        documents = {}
+        for section, (model, columns) in SEARCH_SECTIONS.items():
+            rows = db.query(model.id, model.test_id, *[getattr(model, c) for c in columns])
+            for section_id, test_id, *texts in rows.yield_per(100):
+                text = " ".join(t or "" for t in texts)
+                key = (section, section_id)
+                documents[key] = (test_id, text)
+                for token, count in Counter(tokenize(text)).items():
+                    postings[token][key] = count
+        self._postings = dict(postings)
+        self._documents = documents
+        self._dirty = False
+
+    def search(self, db: Session, query: str, sections: List[str], limit: int, offset: int) -> List[Dict]:
+        with self._lock:
+            if self._dirty:
+                self._build(db)
+            postings, documents = self._postings, self._documents
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores: Dict[Tuple[str, int], float] = defaultdict(float)
+        for term in terms:
+            matches = postings.get(term, {})
+            if not matches:
+                continue
+            idf = math.log(1 + len(documents) / len(matches))
+            for key, count in matches.items():
+                if key[0] in sections:
+                    scores[key] += (1 + math.log(count)) * idf
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[offset:offset + limit]
+        return [
+            {
+                "section": section,
+                "id": section_id,
+                "test_id": documents[(section, section_id)][0],
+                "rank": round(score, 6),
+                "snippet": highlight(documents[(section, section_id)][1], set(terms)),
+            }
+            for (section, section_id), score in ranked
+        ]
+
+
+def _first_match(text: str, terms: set) -> int:
+    """
+    Offset of the first token of `text` that stems to one of `terms`, or 0.
+    A stem is a prefix of its token, so the regex only stops at candidates.
+    """
+    if not terms:
+        return 0
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    for match in re.finditer(rf"(?<![a-z0-9])(?:{alternatives})[a-z0-9]*", text, re.IGNORECASE):
+        token = match.group().lower()
+        if token not in STOP_WORDS and _stem(token) in terms:
+            return match.start()
+    return 0
+
+
+def highlight(text: str, terms: set, max_words: int = 25) -> str:
+    """
+    About `max_words` words around the first match, with matching words
+    marked. Only that window is split into words and tokenized.
+    """
+    offset = _first_match(text, terms)
+    # Back to the start of the word, which may hold more than one token
+    while offset and not text[offset - 1].isspace():
+        offset -= 1
+    lead = max_words // 3
+    before = text[:offset].rsplit(None, lead)
+    cut_start = len(before) > lead
+    if cut_start:
+        before = before[1:]
+    after = text[offset:].split(None, max_words - len(before))
+    cut_end = len(after) > max_words - len(before)
+    if cut_end:
+        after = after[:-1]
+    snippet = " ".join(
+        f"{MARK_START}{html.escape(word)}{MARK_STOP}" if terms.intersection(tokenize(word)) else html.escape(word)
+        for word in before + after
+    )
+    return ("... " if cut_start else "") + snippet + (" ..." if cut_end else "")
+
+
+if engine.dialect.name == "postgresql":
+    search_backend = PostgresSearch()
+else:
+    search_backend = InMemorySearch()
+    for _model, _ in SEARCH_SECTIONS.values():
+        for _event in ("after_insert", "after_update", "after_delete"):
+            event.listen(_model, _event, search_backend.mark_dirty)
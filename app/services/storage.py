@@ -0,0 +1,324 @@
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+from typing import AsyncIterator, Dict, List, Optional
+
+import anyio
+import httpx
+
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class StorageError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def _file_chunks(path: str) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as f:
+        while chunk := await f.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def _save_stream(response: httpx.Response, path: str) -> None:
+    async with await anyio.open_file(path, "wb") as f:
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            await f.write(chunk)
+
+
+class StorageBackend:
+    """
+    Where uploaded files live. Object paths are relative, e.g.
+    "audio/<sha256>.mp3", and the same path always refers to the same bytes.
+    """
+
+    name = "base"
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    async def exists(self, object_path: str) -> bool:
+        raise NotImplementedError
+
+    async def upload(self, object_path: str, file_path: str, content_type: str, size: int, cache_control: str = "3600") -> None:
+        raise NotImplementedError
+
+    async def remove(self, object_paths: List[str]) -> List[Dict]:
+        raise NotImplementedError
+
+    async def download(self, object_path: str, file_path: str) -> None:
+        """Write the object to `file_path`. Raises StorageError with 404 if missing."""
+        raise NotImplementedError
+
+    def local_path(self, object_path: str) -> Optional[str]:
+        """Path of the object on this machine, for backends that keep files locally."""
+        return None
+
+    def public_url(self, object_path: str) -> str:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        pass
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """
+    Async client for the Supabase Storage REST API.
+
+    One pooled httpx.AsyncClient keeps connections alive between calls, a
+    semaphore bounds how many requests are in flight, and failed requests are
+    retried with exponential backoff and jitter. Pass `transport` to point the
+    client at an in-process stand-in instead of the network.
+    """
+
+    name = "supabase"
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        bucket: str,
+        max_concurrency: int = 16,
+        max_retries: int = 3,
+        backoff_base: float = 0.2,
+        timeout: float = 60.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url.rstrip("/")
+        self.key = key
+        self.bucket = bucket
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket_ready = False
+        self.in_flight = 0
+        self.retries = 0
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.key)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.url}/storage/v1",
+                headers={"Authorization": f"Bearer {self.key}", "apikey": self.key},
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        body_path: Optional[str] = None,
+        download_to: Optional[str] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            if body_path is not None:
+                # A streamed body cannot be replayed, so every attempt reopens the file
+                kwargs["content"] = _file_chunks(body_path)
+            try:
+                async with self._semaphore:
+                    self.in_flight += 1
+                    try:
+                        request = client.build_request(method, url, **kwargs)
+                        response = await client.send(request, stream=download_to is not None)
+                        if download_to is not None:
+                            # Successful bodies go straight to disk in chunks
+                            try:
+                                if response.is_error:
+                                    await response.aread()
+                                else:
+                                    await _save_stream(response, download_to)
+                            finally:
+                                await response.aclose()
+                    finally:
+                        self.in_flight -= 1
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise StorageError(f"Storage request failed: {e}")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    if response.is_error:
+                        raise StorageError(
+                            f"Storage returned {response.status_code}: {response.text}",
+                            status_code=response.status_code,
+                        )
+                    return response
+            self.retries += 1
+            await asyncio.sleep(self.backoff_base * (2 ** attempt) * (0.5 + random.random()))
+
+    async def ensure_bucket(self) -> None:
+        if self._bucket_ready:
+            return
+        try:
+            await self._request("POST", "/bucket", json={"id": self.bucket, "name": self.bucket, "public": True})
+        except StorageError as e:
+            # Any answer from storage (already exists, not allowed for this
+            # key) means the bucket is managed elsewhere; only network errors
+            # are worth surfacing
+            if e.status_code is None:
+                raise
+        self._bucket_ready = True
+
+    async def exists(self, object_path: str) -> bool:
+        try:
+            await self._request("HEAD", f"/object/public/{self.bucket}/{object_path}")
+            return True
+        except StorageError as e:
+            if e.status_code in (400, 404):
+                return False
+            raise
+
+    async def upload(self, object_path: str, file_path: str, content_type: str, size: int, cache_control: str = "3600") -> None:
+        await self.ensure_bucket()
+        await self._request(
+            "POST",
+            f"/object/{self.bucket}/{object_path}",
+            body_path=file_path,
+            headers={
+                "Content-Type": content_type,
+                "Content-Length": str(size),
+                "Cache-Control": f"max-age={cache_control}",
+                # Keys are content hashes, so overwriting only happens when two
+                # identical uploads race, and rewrites the same bytes
+                "x-upsert": "true",
+            },
+        )
+
+    async def remove(self, object_paths: List[str]) -> List[Dict]:
+        response = await self._request("DELETE", f"/object/{self.bucket}", json={"prefixes": object_paths})
+        return response.json()
+
+    async def download(self, object_path: str, file_path: str) -> None:
+        try:
+            await self._request("GET", f"/object/public/{self.bucket}/{object_path}", download_to=file_path)
+        except StorageError as e:
+            # Storage answers 400 for objects that do not exist
+            if e.status_code == 400:
+                e.status_code = 404
+            raise
+
+    def public_url(self, object_path: str) -> str:
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{object_path}"
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "retries": self.retries,
+        }
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files under a local directory, served by the app itself at `base_url`
+    through the /media endpoint. Lets the whole stack run offline.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def path_for(self, object_path: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, object_path))
+        if not path.startswith(self.root + os.sep):
+            raise StorageError(f"Invalid object path: {object_path}", status_code=400)
+        return path
+
+    async def exists(self, object_path: str) -> bool:
+        return os.path.isfile(self.path_for(object_path))
+
+    async def upload(self, object_path: str, file_path: str, content_type: str, size: int, cache_control: str = "3600") -> None:
+        target = self.path_for(object_path)
+        await anyio.to_thread.run_sync(self._copy, file_path, target)
+
+    @staticmethod
+    def _copy(source: str, target: str) -> None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy next to the target and rename, so readers never see a partial file
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".partial-")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, partial)
+            os.replace(partial, target)
+        except BaseException:
+            os.unlink(partial)
+            raise
+
+    async def download(self, object_path: str, file_path: str) -> None:
+        source = self.local_path(object_path)
+        if source is None:
+            raise StorageError(f"Object not found: {object_path}", status_code=404)
+        await anyio.to_thread.run_sync(shutil.copyfile, source, file_path)
+
+    def local_path(self, object_path: str) -> Optional[str]:
+        path = self.path_for(object_path)
+        return path if os.path.isfile(path) else None
+
+    async def remove(self, object_paths: List[str]) -> List[Dict]:
+        removed = []
+        for object_path in object_paths:
+            try:
+                os.unlink(self.path_for(object_path))
+                removed.append({"name": object_path})
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def public_url(self, object_path: str) -> str:
+        return f"{self.base_url}/{object_path}"
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, "root": self.root}
+
+
+def create_storage_backend(transport: Optional[httpx.AsyncBaseTransport] = None) -> StorageBackend:
+    backend = os.getenv("STORAGE_BACKEND") or "supabase"
+    if backend == "local":
+        return LocalStorageBackend(
+            root=os.getenv("LOCAL_STORAGE_ROOT", "storage"),
+            base_url=os.getenv("LOCAL_STORAGE_URL", "/media"),
+        )
+    if backend != "supabase":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    return SupabaseStorageBackend(
+        url=os.getenv("SUPABASE_URL", "https://zylnvfwcwdcwrmebnjio.supabase.co"),
+        key=os.getenv("SUPABASE_ANON_KEY", ""),
+        bucket=os.getenv("SUPABASE_BUCKET", "uploads"),
+        max_concurrency=int(os.getenv("STORAGE_MAX_CONCURRENCY", "16")),
+        max_retries=int(os.getenv("STORAGE_MAX_RETRIES", "3")),
+        backoff_base=float(os.getenv("STORAGE_BACKOFF_BASE", "0.2")),
+        timeout=float(os.getenv("STORAGE_TIMEOUT", "60")),
+        transport=transport,
+    )
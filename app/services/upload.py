@@ -1,82 +1,326 @@
 import os
-import uuid
-from typing import Optional, Dict, Any
+import re
+import shutil
+import asyncio
+import functools
+import hashlib
+import tempfile
+import time
+from typing import Optional, Dict, Any, List, Tuple
+import anyio
 from fastapi import HTTPException, UploadFile
-from supabase import create_client, Client
 from PIL import Image
-import io
+from sqlalchemy import or_
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.metrics import record_upload
+from app.models.listening import Listening
+from app.models.test import Test
+from app.models.writing import Writing
+from app.profiling import profiled, record_timing
+from app.services.images import (
+    IMAGE_MAX_PIXELS, ImageTooLarge, VARIANT_FORMATS, VARIANTS, check_dimensions, generate_variants, variant_path, variant_urls,
+)
+from app.services.storage import StorageError, create_storage_backend
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of each accepted format and the content type stored for it
+IMAGE_SIGNATURES = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (8, b"WEBP", "image/webp"),
+)
+AUDIO_SIGNATURES = (
+    (0, b"ID3", "audio/mpeg"),
+    (8, b"WAVE", "audio/wav"),
+    (0, b"OggS", "audio/ogg"),
+    (4, b"ftyp", "audio/mp4"),
+    (0, b"\x1a\x45\xdf\xa3", "audio/webm"),
+)
+
+# Object keys take their extension from the detected type, so the same bytes
+# always map to the same key whatever the uploaded file was called
+EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "audio/mpeg": "mp3",
+    "audio/wav": "wav",
+    "audio/ogg": "ogg",
+    "audio/mp4": "m4a",
+    "audio/webm": "webm",
+}
+
+# Size limit per file type
+MAX_SIZE_MB = {"image": 5, "audio": 20}
+
+# When set, URLs handed out for uploads point at the API's /media endpoint
+# (e.g. "https://api.example.com/media") instead of the storage backend
+MEDIA_URL = os.getenv("MEDIA_URL", "").rstrip("/")
+
+IMAGE_FOLDER = "images"
+_IMAGE_PATH = re.compile(rf"^{IMAGE_FOLDER}/(?P<sha256>[0-9a-f]{{64}})\.\w+$")
+_VARIANT_PATH = re.compile(rf"^{IMAGE_FOLDER}/(?P<sha256>[0-9a-f]{{64}})/")
+
+# Catalog columns holding URLs of uploaded files
+MEDIA_COLUMNS = (
+    (Test, Test.id, (Test.image,)),
+    (Listening, Listening.test_id, (Listening.audio_url1, Listening.audio_url2, Listening.audio_url3, Listening.audio_url4)),
+    (Writing, Writing.test_id, (Writing.task_1_image_url, Writing.task_2_image_url)),
+)
+
+
+@profiled
+def media_references(object_path: str) -> List[int]:
+    """
+    Ids of the tests whose media point at `object_path`. The variants of an
+    image count as used while the image is. Blocking; run in the threadpool.
+    """
+    image = _IMAGE_PATH.match(object_path) or _VARIANT_PATH.match(object_path)
+    test_ids = set()
+    with SessionLocal() as db:
+        for model, test_id, columns in MEDIA_COLUMNS:
+            if image is not None:
+                # Any extension, and URLs from before or after MEDIA_URL was set
+                key = f"{IMAGE_FOLDER}/{image.group('sha256')}."
+                conditions = [column.startswith(key, autoescape=True) for column in columns]
+                conditions += [column.contains(f"/{key}", autoescape=True) for column in columns]
+            else:
+                conditions = [column == object_path for column in columns]
+                conditions += [column.endswith(f"/{object_path}", autoescape=True) for column in columns]
+            test_ids.update(row[0] for row in db.query(test_id).filter(or_(*conditions)))
+    return sorted(test_ids)
+
+
+def sniff_content_type(header: bytes, file_type: str) -> Optional[str]:
+    signatures = IMAGE_SIGNATURES if file_type == "image" else AUDIO_SIGNATURES
+    for offset, magic, content_type in signatures:
+        if header[offset:offset + len(magic)] == magic:
+            if magic in (b"WEBP", b"WAVE") and header[:4] != b"RIFF":
+                continue
+            return content_type
+    # MPEG audio without an ID3 tag starts directly with a frame sync
+    if file_type == "audio" and len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        return "audio/mpeg"
+    return None
+
 
 class UploadService:
     def __init__(self):
-        supabase_url = "https://zylnvfwcwdcwrmebnjio.supabase.co"
-        supabase_key = os.getenv("SUPABASE_ANON_KEY")
-        
-        if not supabase_key:
-            print("Warning: SUPABASE_ANON_KEY not set. Upload functionality will be limited.")
-            supabase_key = "placeholder_key"
-        
-        try:
-            self.supabase: Client = create_client(supabase_url, supabase_key)
-            self.bucket_name = "uploads"
-            self._ensure_bucket_exists()
-        except Exception as e:
-            print(f"Warning: Could not initialize Supabase client: {e}")
-            self.supabase = None
-    
-    def _ensure_bucket_exists(self):
-        try:
-            # Try to create the bucket (will fail if it already exists, which is fine)
-            self.supabase.storage.create_bucket(self.bucket_name, {"public": True})
-            print(f"Created bucket: {self.bucket_name}")
-        except Exception:
-            # Bucket probably already exists
-            pass
+        self.storage = create_storage_backend()
     
-    def _validate_file_size(self, file: UploadFile, max_size_mb: int = 10) -> None:
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
+    async def _spool(self, file: UploadFile, max_size_mb: int) -> Tuple[str, int, bytes, str]:
+        """
+        Copy the upload to a temporary file in fixed-size chunks.
+
+        The size limit is enforced while reading, so an oversized upload is
+        rejected without reading it to the end. Returns the temporary file's
+        path, the size, the first bytes of the file for format sniffing and
+        the SHA-256 hex digest of the content.
+        """
         max_size_bytes = max_size_mb * 1024 * 1024
-        if file_size > max_size_bytes:
+        if file.size is not None and file.size > max_size_bytes:
             raise HTTPException(
                 status_code=413,
                 detail=f"File size exceeds {max_size_mb}MB limit"
             )
+
+        # File I/O runs in worker threads, like the rest of the storage code
+        fd, path = await anyio.to_thread.run_sync(functools.partial(tempfile.mkstemp, prefix="upload-"))
+        size = 0
+        header = b""
+        digest = hashlib.sha256()
+        try:
+            async with await anyio.open_file(fd, "wb") as spooled:
+                while chunk := await file.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size_bytes:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"File size exceeds {max_size_mb}MB limit"
+                        )
+                    if len(header) < 64:
+                        header += chunk[:64 - len(header)]
+                    digest.update(chunk)
+                    await spooled.write(chunk)
+        except BaseException:
+            # Not awaited: a cancelled request could not wait for a thread
+            os.unlink(path)
+            raise
+        return path, size, header, digest.hexdigest()
     
-    def _validate_image(self, file: UploadFile) -> None:
+    def _validate_image(self, content_type: Optional[str]) -> None:
         allowed_formats = {'image/jpeg', 'image/png', 'image/jpg', 'image/webp'}
         
-        if file.content_type not in allowed_formats:
+        if content_type not in allowed_formats:
             raise HTTPException(
                 status_code=400,
                 detail="Invalid image format. Allowed: JPEG, PNG, WebP"
             )
-        
+    
+    def _check_image_header(self, path: str) -> None:
+        # Image.open only parses the header; pixel data is never decoded here
         try:
-            file_content = file.file.read()
-            file.file.seek(0)
-            
-            image = Image.open(io.BytesIO(file_content))
-            image.verify()
+            with Image.open(path) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            width = height = IMAGE_MAX_PIXELS
         except Exception:
             raise HTTPException(
                 status_code=400,
                 detail="Invalid or corrupted image file"
             )
+        try:
+            check_dimensions(width, height)
+        except ImageTooLarge as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    async def _put(self, object_path: str, path: str, content_type: str, size: int) -> None:
+        # Every object goes through here, so its upload time shows up in
+        # /metrics and in request profiles
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            await self.storage.upload(object_path, path, content_type, size)
+            outcome = "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            record_upload(self.storage.name, outcome, elapsed, size)
+            record_timing("storage", elapsed)
+    
+    async def _store_variants(self, path: str, sha256: str) -> Dict[str, Dict[str, str]]:
+        """
+        Resize the image into every variant and store the ones that are not
+        stored yet. Variant keys are derived from the original's hash, so a
+        re-upload of the same image finds them all and renders nothing.
+        """
+        keys = [
+            variant_path(IMAGE_FOLDER, sha256, variant, fmt)
+            for variant in VARIANTS for fmt in VARIANT_FORMATS
+        ]
+        stored = await asyncio.gather(*(self.storage.exists(key) for key in keys))
+        if not all(stored):
+            out_dir = tempfile.mkdtemp(prefix="variants-")
+            try:
+                try:
+                    rendered = await generate_variants(path, out_dir)
+                except (OSError, ValueError, ImageTooLarge, Image.DecompressionBombError):
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Invalid or corrupted image file"
+                    )
+                await asyncio.gather(*(
+                    self._put(
+                        variant_path(IMAGE_FOLDER, sha256, variant, fmt),
+                        variant_file,
+                        content_type,
+                        os.path.getsize(variant_file),
+                    )
+                    for variant, fmt, variant_file, content_type in rendered
+                ))
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+        return variant_urls(self.public_url, IMAGE_FOLDER, sha256)
     
-    def _validate_audio(self, file: UploadFile) -> None:
+    def public_url(self, object_path: str) -> str:
+        if MEDIA_URL:
+            return f"{MEDIA_URL}/{object_path}"
+        return self.storage.public_url(object_path)
+    
+    def image_variants(self, url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Variant URLs for an image uploaded through /upload/image, found from
+        its URL alone. Returns None for any other URL.
+        """
+        if not url:
+            return None
+        # Images stored before MEDIA_URL was set still have backend URLs
+        for prefix in (self.public_url(""), self.storage.public_url("")):
+            if url.startswith(prefix):
+                match = _IMAGE_PATH.match(url[len(prefix):])
+                if match is not None:
+                    return variant_urls(self.public_url, IMAGE_FOLDER, match.group("sha256"))
+        return None
+    
+    def _validate_audio(self, content_type: Optional[str]) -> None:
         allowed_formats = {
             'audio/mpeg', 'audio/mp3', 'audio/wav', 'audio/x-wav',
             'audio/mp4', 'audio/m4a', 'audio/ogg', 'audio/webm'
         }
         
-        if file.content_type not in allowed_formats:
+        if content_type not in allowed_formats:
             raise HTTPException(
                 status_code=400,
                 detail="Invalid audio format. Allowed: MP3, WAV, M4A, OGG, WebM"
             )
     
+    def check_upload(self, file_type: str, content_type: Optional[str]) -> int:
+        """
+        Reject uploads the service cannot take before any bytes are read.
+        Returns the size limit in MB for the file type.
+        """
+        if not self.storage.is_configured:
+            raise HTTPException(
+                status_code=503,
+                detail="Storage client not configured. Please check SUPABASE_ANON_KEY"
+            )
+        
+        if file_type == "image":
+            self._validate_image(content_type)
+        elif file_type == "audio":
+            self._validate_audio(content_type)
+        else:
+            raise HTTPException(status_code=400, detail="Invalid file type")
+        return MAX_SIZE_MB[file_type]
+    
+    async def store_file(
+        self,
+        path: str,
+        file_size: int,
+        header: bytes,
+        sha256: str,
+        file_type: str,
+        folder: str,
+    ) -> Dict[str, Any]:
+        """
+        Check the content of a complete local file and put it in storage.
+        The caller owns `path` and removes it afterwards.
+        """
+        content_type = sniff_content_type(header, file_type)
+        if content_type is None:
+            raise HTTPException(
+                status_code=400,
+                detail="File content does not match an allowed format"
+            )
+        if file_type == "image":
+            self._check_image_header(path)
+        
+        # Keys are content hashes, so an identical file is already
+        # stored under this key and does not need to be sent again
+        object_path = f"{folder}/{sha256}.{EXTENSIONS[content_type]}"
+        variants = None
+        if file_type == "image":
+            # Before the original, so an image that fails to decode
+            # leaves nothing behind in storage
+            variants = await self._store_variants(path, sha256)
+        deduplicated = await self.storage.exists(object_path)
+        if not deduplicated:
+            # The backend streams the file in chunks
+            await self._put(object_path, path, content_type, file_size)
+        
+        return {
+            "success": True,
+            "file_url": self.public_url(object_path),
+            "file_path": object_path,
+            "file_size": file_size,
+            "content_type": content_type,
+            "sha256": sha256,
+            "deduplicated": deduplicated,
+            "variants": variants,
+        }
+    
     async def upload_file(
         self, 
         file: UploadFile, 
@@ -84,54 +328,23 @@ class UploadService:
         folder: str = "general"
     ) -> Dict[str, Any]:
         try:
-            if not self.supabase:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Supabase client not initialized. Please check SUPABASE_ANON_KEY"
-                )
-            
-            if file_type == "image":
-                self._validate_image(file)
-                self._validate_file_size(file, max_size_mb=5)
-            elif file_type == "audio":
-                self._validate_audio(file)
-                self._validate_file_size(file, max_size_mb=20)
-            else:
-                raise HTTPException(status_code=400, detail="Invalid file type")
+            max_size_mb = self.check_upload(file_type, file.content_type)
             
-            file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
-            unique_filename = f"{folder}/{uuid.uuid4()}.{file_extension}"
+            path, file_size, header, sha256 = await self._spool(file, max_size_mb)
+            try:
+                result = await self.store_file(path, file_size, header, sha256, file_type, folder)
+            finally:
+                os.unlink(path)
             
-            file_content = await file.read()
-            
-            result = self.supabase.storage.from_(self.bucket_name).upload(
-                unique_filename,
-                file_content,
-                {
-                    "content-type": file.content_type,
-                    "cache-control": "3600"
-                }
-            )
-            
-            if hasattr(result, 'error') and result.error:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Upload failed: {result.error}"
-                )
-            
-            public_url = self.supabase.storage.from_(self.bucket_name).get_public_url(unique_filename)
-            
-            return {
-                "success": True,
-                "file_url": public_url,
-                "file_path": unique_filename,
-                "file_size": len(file_content),
-                "content_type": file.content_type,
-                "original_filename": file.filename
-            }
+            return {**result, "original_filename": file.filename}
             
         except HTTPException:
             raise
+        except StorageError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Upload failed: {str(e)}"
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -139,19 +352,33 @@ class UploadService:
             )
     
     async def delete_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        Delete a stored file, and the variants of an image with it. Keys are
+        content hashes, so one file can back several tests; it is only
+        deleted once no test uses it.
+        """
+        test_ids = await run_in_threadpool(media_references, file_path)
+        if test_ids:
+            raise HTTPException(
+                status_code=409,
+                detail=f"File is used by tests {', '.join(map(str, test_ids))}; remove it from them first"
+            )
+        paths = [file_path]
+        image = _IMAGE_PATH.match(file_path)
+        if image is not None:
+            paths += [
+                variant_path(IMAGE_FOLDER, image.group("sha256"), variant, fmt)
+                for variant in VARIANTS for fmt in VARIANT_FORMATS
+            ]
         try:
-            result = self.supabase.storage.from_(self.bucket_name).remove([file_path])
-            
-            if hasattr(result, 'error') and result.error:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Delete failed: {result.error}"
-                )
+            await self.storage.remove(paths)
+            return {"success": True, "message": "File deleted successfully", "deleted": paths}
             
-            return {"success": True, "message": "File deleted successfully"}
-            
-        except HTTPException:
-            raise
+        except StorageError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Delete failed: {str(e)}"
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
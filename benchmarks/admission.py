@@ -0,0 +1,96 @@
+"""Latency of a regular client while an aggressive one polls GET /tests/.
+
+The aggressive client keeps --flood requests in flight, the regular one
+pages through GET /reading/ one request at a time. Every SQL statement
+sleeps for --latency seconds and the pool is smaller than the thread pool,
+so without admission control the flood queues up for connections ahead of
+the regular client.
+
+    python -m benchmarks.admission --latency 0.02 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DB_POOL_SIZE", "4")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+from benchmarks.common import simulate_db_latency
+from tests.catalog import seed_catalog
+
+import httpx
+
+from app.admission import admission_controller
+from app.main import app
+
+
+async def client(http, paths, token: str, in_flight: int, deadline: float) -> dict:
+    latencies = []
+    statuses = {}
+
+    async def worker(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await http.get(paths[i % len(paths)], headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            i += in_flight
+            if response.status_code in (429, 503):
+                # Shorter than Retry-After, but keeps the benchmark's own client
+                # from taking over the event loop the app runs on
+                await asyncio.sleep(0.1)
+
+    await asyncio.gather(*(worker(n) for n in range(in_flight)))
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "statuses": statuses,
+    }
+
+
+async def run(flood_paths, regular_paths, flood: int, seconds: float):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            deadline = time.perf_counter() + seconds
+            return await asyncio.gather(
+                client(http, flood_paths, "aggressive", flood, deadline),
+                client(http, regular_paths, "regular", 1, deadline),
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--flood", type=int, default=32)
+    args = parser.parse_args()
+
+    ids = seed_catalog(tests=10, words=200)
+    flood_paths = ["/tests/?limit=50"]
+    regular_paths = [f"/reading/?limit=5&after_id={test_id}" for test_id in ids]
+
+    remove = simulate_db_latency(args.latency)
+    try:
+        print(f"{'limits':>8} {'client':>12} {'p50 ms':>10} {'p95 ms':>10}  statuses")
+        for label, settings in (
+            ("off", {"rate": 0, "route_limit": 0, "max_pool_waiters": 0}),
+            ("on", {"rate": 20, "burst": 40, "route_limit": 8, "max_pool_waiters": 4}),
+        ):
+            for name, value in settings.items():
+                setattr(admission_controller, name, value)
+            admission_controller.reset()
+            flood, regular = asyncio.run(run(flood_paths, regular_paths, args.flood, args.seconds))
+            for name, result in (("aggressive", flood), ("regular", regular)):
+                print(f"{label:>8} {name:>12} {result['p50_ms']:>10.1f} "
+                      f"{result['p95_ms']:>10.1f}  {result['statuses']}")
+    finally:
+        remove()
+
+
+if __name__ == "__main__":
+    main()
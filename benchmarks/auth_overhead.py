@@ -0,0 +1,56 @@
+"""Cost of the admin auth dependency per request, with and without the token cache.
+
+The legacy row decodes and checks the signature of the token on every
+call, the way get_current_user used to. The cold row is the first request
+with a token, the cached row every request after that.
+
+    python -m benchmarks.auth_overhead --calls 100000
+"""
+import argparse
+import asyncio
+import time
+
+import benchmarks.common  # noqa: F401  (sets up the benchmark database)
+
+import jwt
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import ALGORITHM, SECRET_KEY, create_access_token, get_current_user, token_cache
+
+
+async def legacy(credentials: HTTPAuthorizationCredentials):
+    payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    if payload.get("role") != "admin":
+        raise ValueError("not an admin")
+    return {"role": payload["role"]}
+
+
+async def cold(credentials: HTTPAuthorizationCredentials):
+    token_cache.discard(credentials.credentials)
+    return await get_current_user(credentials)
+
+
+async def measure(dependency, credentials, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await dependency(credentials)
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=create_access_token({"role": "admin"})
+    )
+    print(f"{args.calls} calls")
+    print(f"{'dependency':>12} {'us/call':>10} {'calls/s':>12}")
+    for label, dependency in (("legacy", legacy), ("cold", cold), ("cached", get_current_user)):
+        seconds = asyncio.run(measure(dependency, credentials, args.calls))
+        print(f"{label:>12} {seconds * 1e6:>10.2f} {1 / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Per-submission cost of POST /reading/{id}/grade/batch at different batch sizes.
+
+    python -m benchmarks.batch_grading --sizes 1 100 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import benchmarks.common  # noqa: F401  (sets up the benchmark database)
+from tests.catalog import answer_sheet, seed_catalog
+
+import httpx
+
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.main import app
+from app.models.reading import Reading
+
+
+def submissions(count: int) -> list:
+    # Roughly three answers in four are right, in mixed case and spacing
+    return [
+        {
+            "student_id": f"s{n}",
+            "answers": {
+                part: {
+                    q: (answer.lower() + " " if (n + q) % 4 else "wrong")
+                    for q, answer in answer_sheet(1 + part).items()
+                }
+                for part in range(1, 5)
+            },
+        }
+        for n in range(count)
+    ]
+
+
+async def run(reading_id: int, sizes, repeats: int):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        headers = {"Authorization": f"Bearer {create_access_token({'role': 'admin'})}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as client:
+            # Warm the compiled answer key and the process pool
+            await client.post(f"/reading/{reading_id}/grade/batch", json={"submissions": submissions(2000)})
+
+            print(f"{'batch size':>10} {'total ms':>10} {'us/submission':>14}")
+            for size in sizes:
+                payload = {"submissions": submissions(size)}
+                elapsed = 0.0
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    lines = 0
+                    async with client.stream("POST", f"/reading/{reading_id}/grade/batch", json=payload) as response:
+                        async for line in response.aiter_lines():
+                            if line:
+                                json.loads(line)
+                                lines += 1
+                    elapsed += time.perf_counter() - started
+                    assert lines == size, (lines, size)
+                elapsed /= repeats
+                print(f"{size:>10} {elapsed * 1000:>10.2f} {elapsed / size * 1e6:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    test_id = seed_catalog(tests=1, words=50)[0]
+    db = SessionLocal()
+    try:
+        reading_id = db.query(Reading.id).filter(Reading.test_id == test_id).scalar()
+    finally:
+        db.close()
+    asyncio.run(run(reading_id, args.sizes, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
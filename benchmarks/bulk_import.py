@@ -0,0 +1,109 @@
+"""Loading a content pack with five POSTs per test versus one streamed import.
+
+    python -m benchmarks.bulk_import --tests 200 --latency 0.005
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import simulate_db_latency
+from tests.catalog import answer_sheet, passage
+
+import httpx
+from sqlalchemy import event
+
+from app.auth import create_access_token
+from app.database import engine
+from app.main import app
+
+HEADERS = {"Authorization": f"Bearer {create_access_token({'role': 'admin'})}"}
+
+
+def complete_test(n: int, words: int) -> dict:
+    return {
+        "title": f"Content Pack Test {n + 1}",
+        "description": passage(40, n),
+        "reading": {
+            **{f"text{i}": passage(words, n + i) for i in range(1, 5)},
+            **{f"answer_sheet{i}": answer_sheet(n + i) for i in range(1, 5)},
+        },
+        "listening": {
+            **{f"text{i}": passage(words, n + i) for i in range(1, 5)},
+            **{f"audio_url{i}": f"audio/{n}-{i}.mp3" for i in range(1, 5)},
+            **{f"answer_sheet{i}": answer_sheet(n + i) for i in range(1, 5)},
+        },
+        "writing": {
+            "task_1_text": passage(150, n),
+            "task_2_text": passage(250, n),
+            "task_1_instruction": "Summarise the information.",
+            "task_2_instruction": "Discuss both views.",
+            "task_1_ai_prompt": "Grade task 1.",
+            "task_2_ai_prompt": "Grade task 2.",
+        },
+        "speaking": {
+            "questions": ["Tell me about your hometown", "Describe your favorite hobby"],
+            "instruction_ai": "Act as an IELTS examiner.",
+        },
+    }
+
+
+async def five_calls(client: httpx.AsyncClient, records):
+    for record in records:
+        test = {key: record[key] for key in ("title", "description")}
+        response = await client.post("/tests/", json=test, headers=HEADERS)
+        test_id = response.json()["id"]
+        for section in ("reading", "listening", "writing", "speaking"):
+            await client.post(f"/{section}/", json={**record[section], "test_id": test_id}, headers=HEADERS)
+
+
+async def streamed(client: httpx.AsyncClient, records):
+    async def body():
+        for record in records:
+            yield (json.dumps(record) + "\n").encode()
+
+    response = await client.post("/bulk/tests/import", content=body(), headers=HEADERS)
+    assert response.json()["failed"] == 0, response.json()["errors"][:3]
+
+
+async def run(load, records) -> dict:
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                started = time.perf_counter()
+                await load(client, records)
+                elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return {"seconds": elapsed, "statements": len(statements)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tests", type=int, default=200)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    records = [complete_test(n, args.words) for n in range(args.tests)]
+    remove = simulate_db_latency(args.latency)
+    try:
+        print(f"{args.tests} complete tests, {args.latency * 1000:.1f} ms per statement")
+        print(f"{'pattern':>12} {'seconds':>10} {'tests/s':>10} {'statements':>12}")
+        for label, load in (("five calls", five_calls), ("import", streamed)):
+            result = asyncio.run(run(load, records))
+            print(f"{label:>12} {result['seconds']:>10.2f} "
+                  f"{args.tests / result['seconds']:>10.1f} {result['statements']:>12}")
+    finally:
+        remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Benchmarks run against a throwaway SQLite database unless DATABASE_URL is set
+if "DATABASE_URL" not in os.environ:
+    _db_dir = tempfile.mkdtemp(prefix="ieltsly-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+# Every benchmark request comes from one client, so admission control is off
+# unless a benchmark turns it on
+os.environ.setdefault("RATE_LIMIT_RPS", "0")
+os.environ.setdefault("ROUTE_CONCURRENCY_LIMIT", "0")
+os.environ.setdefault("ADMISSION_MAX_POOL_WAITERS", "0")
+
+import httpx
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+from tests.catalog import migrate
+
+# Benchmarks run against a migrated database
+migrate()
+
+
+def simulate_db_latency(seconds: float):
+    """Sleep on every statement to mimic a network round trip to Postgres."""
+    def _sleep(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(seconds)
+
+    event.listen(engine, "before_cursor_execute", _sleep)
+    return lambda: event.remove(engine, "before_cursor_execute", _sleep)
+
+
+def percentile(latencies, fraction: float) -> float:
+    """Nearest-rank percentile of sorted `latencies`."""
+    return latencies[max(0, math.ceil(len(latencies) * fraction) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """Highest resident set size of this process so far."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb() -> float:
+    """Resident set size of this process, or its peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+async def drive(paths, concurrency: int, requests: int, headers=None) -> dict:
+    """
+    Fire `requests` requests over `paths` with `concurrency` in flight. A
+    path is a GET, or a (method, path, kwargs) tuple where kwargs are passed
+    on to httpx, e.g. ("POST", "/reading/1/grade", {"json": {...}}).
+    """
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def worker():
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    method, path, kwargs = ("GET", item, {}) if isinstance(item, str) else item
+                    kwargs = {**kwargs, "headers": {**(headers or {}), **kwargs.get("headers", {})}}
+                    started = time.perf_counter()
+                    response = await client.request(method, path, **kwargs)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            rss_before = rss_mb()
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            rss_after = rss_mb()
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "throughput": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rss_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+        "statuses": statuses,
+    }
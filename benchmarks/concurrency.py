@@ -0,0 +1,40 @@
+"""Throughput of the section routers as the number of in-flight requests grows.
+
+Every SQL statement sleeps for --latency seconds to stand in for a Postgres
+round trip. With the handlers running in the worker thread pool, throughput
+should scale with concurrency up to DB_THREADPOOL_SIZE instead of staying flat.
+
+    python -m benchmarks.concurrency --latency 0.02 --requests 400
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import drive, simulate_db_latency
+from tests.catalog import seed_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    ids = seed_catalog(tests=10, words=200)
+    paths = [f"/{section}/test/{test_id}" for test_id in ids
+             for section in ("reading", "listening", "writing", "speaking")]
+    paths += [f"/tests/{test_id}" for test_id in ids]
+
+    remove = simulate_db_latency(args.latency)
+    try:
+        print(f"{'in-flight':>10} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10}")
+        for concurrency in args.concurrency:
+            result = asyncio.run(drive(paths, concurrency, args.requests))
+            print(f"{concurrency:>10} {result['throughput']:>10.1f} "
+                  f"{result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f}")
+    finally:
+        remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Peak Python heap use of exporting the catalog.
+
+The legacy row loads every table with .all() and serializes the whole
+result, the way the list endpoints do. The streaming row drains
+GET /bulk/tests/export.
+
+    python -m benchmarks.export_memory --tests 200 --words 1000
+"""
+import argparse
+import tracemalloc
+
+import benchmarks.common  # noqa: F401  (sets up the benchmark database)
+from tests.catalog import seed_catalog
+
+from app.database import SessionLocal
+from app.models.bulk import TestExport
+from app.models.test import Test
+from app.services.bulk import export_tests
+
+
+def legacy():
+    db = SessionLocal()
+    try:
+        tests = db.query(Test).all()
+        for section in ("listening", "reading", "speaking", "writing"):
+            for test in tests:
+                getattr(test, section)
+        body = b"\n".join(TestExport.model_validate(test).model_dump_json().encode() for test in tests)
+        return len(body)
+    finally:
+        db.close()
+
+
+def streaming(compress: bool):
+    return sum(len(chunk) for chunk in export_tests(compress=compress))
+
+
+def measure(export) -> tuple:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    size = export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tests", type=int, default=200)
+    parser.add_argument("--words", type=int, default=1000)
+    args = parser.parse_args()
+
+    seed_catalog(tests=args.tests, words=args.words)
+    print(f"{args.tests} tests, {args.words} words per passage")
+    print(f"{'export':>10} {'MB out':>10} {'peak MB':>10}")
+    for label, export in (
+        ("legacy", legacy),
+        ("ndjson", lambda: streaming(False)),
+        ("gzip", lambda: streaming(True)),
+    ):
+        size, peak = measure(export)
+        print(f"{label:>10} {size / (1024 * 1024):>10.2f} {peak:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""In-process stand-in for the Supabase Storage REST API.
+
+Implements the bucket, upload, delete and public download calls the app
+makes, with optional per-request latency and a failure rate to exercise
+retries. Use `transport()` for an in-process httpx transport, or `serve()`
+to run it on a local port so connection reuse is exercised as well.
+"""
+import asyncio
+import random
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+class FakeStorage:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, keep_bytes: bool = True):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.keep_bytes = keep_bytes
+        self.objects = {}
+        self.requests = 0
+        self.app = Starlette(routes=[
+            Route("/storage/v1/bucket", self.create_bucket, methods=["POST"]),
+            Route("/storage/v1/object/public/{bucket}/{path:path}", self.download, methods=["GET", "HEAD"]),
+            Route("/storage/v1/object/{bucket}/{path:path}", self.upload, methods=["POST", "PUT"]),
+            Route("/storage/v1/object/{bucket}", self.remove, methods=["DELETE"]),
+        ])
+
+    async def _delay(self):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        return None
+
+    async def create_bucket(self, request: Request):
+        return await self._delay() or JSONResponse({"name": (await request.json())["name"]})
+
+    async def upload(self, request: Request):
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        size = 0
+        chunks = []
+        async for chunk in request.stream():
+            size += len(chunk)
+            if self.keep_bytes:
+                chunks.append(chunk)
+        failed = await self._delay()
+        if failed:
+            return failed
+        self.objects[key] = (b"".join(chunks), request.headers.get("content-type"), size)
+        return JSONResponse({"Key": key})
+
+    async def remove(self, request: Request):
+        failed = await self._delay()
+        if failed:
+            return failed
+        bucket = request.path_params["bucket"]
+        removed = []
+        for path in (await request.json())["prefixes"]:
+            if self.objects.pop(f"{bucket}/{path}", None) is not None:
+                removed.append({"name": path})
+        return JSONResponse(removed)
+
+    async def download(self, request: Request):
+        failed = await self._delay()
+        if failed:
+            return failed
+        entry = self.objects.get(f"{request.path_params['bucket']}/{request.path_params['path']}")
+        if entry is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        body, content_type, _ = entry
+        return Response(body, media_type=content_type)
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        return httpx.ASGITransport(app=self.app)
+
+    def serve(self) -> str:
+        """Run on a free local port in a background thread and return its base URL."""
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{port}"
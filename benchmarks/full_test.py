@@ -0,0 +1,71 @@
+"""Opening a test with five calls versus a single GET /tests/{id}/full.
+
+    python -m benchmarks.full_test --latency 0.005 --opens 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import simulate_db_latency
+from tests.catalog import seed_catalog
+
+import httpx
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+SECTIONS = ("reading", "listening", "writing", "speaking")
+
+
+async def open_tests(ids, opens: int, full: bool) -> dict:
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                started = time.perf_counter()
+                for n in range(opens):
+                    test_id = ids[n % len(ids)]
+                    if full:
+                        await client.get(f"/tests/{test_id}/full")
+                    else:
+                        await client.get(f"/tests/{test_id}")
+                        for section in SECTIONS:
+                            await client.get(f"/{section}/test/{test_id}")
+                elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    return {
+        "ms_per_open": elapsed / opens * 1000,
+        "queries_per_open": len(statements) / opens,
+        "requests_per_open": 1 if full else 1 + len(SECTIONS),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--opens", type=int, default=100)
+    args = parser.parse_args()
+
+    ids = seed_catalog(tests=10)
+    remove = simulate_db_latency(args.latency)
+    try:
+        print(f"{'pattern':>12} {'ms/open':>10} {'queries':>10} {'requests':>10}")
+        for label, full in (("five calls", False), ("/full", True)):
+            result = asyncio.run(open_tests(ids, args.opens, full))
+            print(f"{label:>12} {result['ms_per_open']:>10.2f} "
+                  f"{result['queries_per_open']:>10.1f} {result['requests_per_open']:>10}")
+    finally:
+        remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cost of collecting metrics on the hot path.
+
+The request rows call an ASGI app that answers immediately, with and
+without MetricsMiddleware around it. The query rows run SELECT 1 on one
+connection, with and without the cursor-execute listeners.
+
+    python -m benchmarks.metrics_overhead --calls 100000
+"""
+import argparse
+import asyncio
+import time
+
+import benchmarks.common  # noqa: F401  (sets up the benchmark database)
+
+from sqlalchemy import event, text
+
+from app.database import engine
+from app.metrics import MetricsMiddleware, _after_cursor_execute, _before_cursor_execute
+
+SCOPE = {"type": "http", "method": "GET", "path": "/tests/", "headers": []}
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def measure_requests(app, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / calls
+
+
+def measure_queries(calls: int) -> float:
+    with engine.connect() as connection:
+        statement = text("SELECT 1")
+        started = time.perf_counter()
+        for _ in range(calls):
+            connection.execute(statement)
+        return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls")
+    print(f"{'':>18} {'us/call':>10}")
+    for label, app in (("request, bare", bare_app), ("request, metrics", MetricsMiddleware(bare_app))):
+        seconds = asyncio.run(measure_requests(app, args.calls))
+        print(f"{label:>18} {seconds * 1e6:>10.2f}")
+
+    measure_queries(args.calls // 10)  # warm up the connection and statement cache
+    with_listeners = measure_queries(args.calls)
+    event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+    without_listeners = measure_queries(args.calls)
+    print(f"{'query, bare':>18} {without_listeners * 1e6:>10.2f}")
+    print(f"{'query, metrics':>18} {with_listeners * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
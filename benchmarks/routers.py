@@ -0,0 +1,219 @@
+"""Load test of every router, with stored baselines to catch regressions.
+
+The app runs in process against a freshly seeded catalog: four ~1,000-word
+texts per reading and listening row, by default in a throwaway SQLite
+database (set DATABASE_URL to an empty local Postgres database instead).
+Storage is the in-process fake from benchmarks/fake_storage.py. Each
+scenario drives one router's read paths, plus grading, login and uploads;
+catalog edits are left out so every scenario sees the same data.
+
+For every scenario and concurrency it reports p50/p95/p99 latency,
+throughput and the RSS of the process, each the best of --repeat runs so
+a single hiccup is not reported as a regression. --save writes the results
+to the baseline file; later runs compare against it and exit with status 1
+when a scenario got slower or returned errors, or the peak RSS of the whole
+run grew. RSS after a scenario depends on the scenarios before it, so it
+is only reported. Baselines only
+hold for the machine and settings they were recorded with, so record them
+where the comparison runs.
+
+    python -m benchmarks.routers --concurrency 1 8 --requests 100
+    python -m benchmarks.routers --save
+    python -m benchmarks.routers --only reading,search
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+
+os.environ.setdefault("MEDIA_CACHE_DIR", tempfile.mkdtemp(prefix="ieltsly-bench-media-"))
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+os.environ["STORAGE_BACKEND"] = "supabase"
+
+from benchmarks.common import drive, peak_rss_mb, simulate_db_latency
+from tests.catalog import answer_sheet, seed_catalog
+
+from app.auth import ADMIN_PASS_KEY, create_access_token
+from app.services.media import media_cache
+from app.services.storage import create_storage_backend
+from app.services.upload import upload_service
+from benchmarks.fake_storage import FakeStorage
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "routers.json")
+# Compared against the baseline, with 1 where higher is worse; the rest is
+# only reported
+COMPARED = (("throughput", -1), ("p95_ms", 1))
+MEDIA_OBJECT = "audio/bench.mp3"
+AUDIO = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes(range(256)) * 256
+
+
+def grade(section: str, section_id: int, student_id=None):
+    body = {"answers": {part: answer_sheet(section_id + part) for part in range(1, 5)}}
+    if student_id is not None:
+        body["student_id"] = student_id
+    return ("POST", f"/{section}/{section_id}/grade", {"json": body})
+
+
+def scenarios(ids):
+    """Router -> (requests, needs an admin token)."""
+    sections = {
+        section: [f"/{section}/", f"/{section}/?limit=5&fields=id,test_id"]
+        + [f"/{section}/test/{test_id}" for test_id in ids]
+        + [f"/{section}/{test_id}" for test_id in ids]
+        for section in ("reading", "listening", "writing", "speaking")
+    }
+    # Section ids match test ids in a freshly seeded catalog
+    for section in ("reading", "listening"):
+        sections[section] += [grade(section, section_id) for section_id in ids]
+    return {
+        "tests": (["/tests/", "/tests/?limit=5"] + [f"/tests/{test_id}" for test_id in ids]
+                  + [f"/tests/{test_id}/full" for test_id in ids], False),
+        **{section: (paths, False) for section, paths in sections.items()},
+        "answers": ([f"/{section}/{test_id}/answers" for test_id in ids
+                     for section in ("reading", "listening")], True),
+        "search": ([f"/search/?q={q}" for q in ("climate", "ocean research", "museum history", "energy")]
+                   + ["/search/?q=science&sections=reading,listening&limit=5"], False),
+        "attempts": ([grade("reading", test_id, student_id=f"student-{test_id}") for test_id in ids]
+                     + ["/attempts/", "/attempts/?limit=5"], True),
+        "auth": ([("POST", "/auth/admin/login", {"json": {"admin_pass_key": ADMIN_PASS_KEY}})], False),
+        "bulk": (["/bulk/tests/export", "/bulk/tests/export?gzip=true"], True),
+        "upload": ([("POST", "/upload/audio", {"files": {"file": ("recording.mp3", AUDIO, "audio/mpeg")}})], True),
+        "media": ([f"/media/{MEDIA_OBJECT}", ("GET", f"/media/{MEDIA_OBJECT}", {"headers": {"Range": "bytes=0-1023"}})],
+                  False),
+        "metrics": (["/metrics"], False),
+        "internal": (["/internal/db-pool", "/internal/cache", "/internal/storage", "/internal/admission"], True),
+    }
+
+
+def best(results: list) -> dict:
+    """Highest throughput and lowest latencies of repeated runs, and the RSS after the last."""
+    combined = {"throughput": max(result["throughput"] for result in results), "rss_mb": results[-1]["rss_mb"]}
+    for metric in ("p50_ms", "p95_ms", "p99_ms"):
+        combined[metric] = min(result[metric] for result in results)
+    combined["statuses"] = {}
+    for result in results:
+        for status, count in result["statuses"].items():
+            combined["statuses"][status] = combined["statuses"].get(status, 0) + count
+    return combined
+
+
+def errors(result: dict) -> int:
+    return sum(count for status, count in result["statuses"].items() if status >= 400)
+
+
+def worse(metric: str, old: float, new: float, direction: int, tolerance: float) -> str:
+    """Empty unless `new` is worse than `old` by more than `tolerance`."""
+    change = (new - old) / old if old else 0.0
+    if change * direction > tolerance:
+        return f"{metric} {old:.1f} -> {new:.1f} ({change:+.0%})"
+    return ""
+
+
+def compare(result: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    notes = []
+    for metric, direction in COMPARED:
+        if metric.endswith("_ms") and abs(result[metric] - baseline[metric]) < min_delta_ms:
+            continue
+        notes.append(worse(metric, baseline[metric], result[metric], direction, tolerance))
+    return [note for note in notes if note]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every SQL statement")
+    parser.add_argument("--only", help="comma-separated scenarios to run")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative change before a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="latency changes below this are noise")
+    args = parser.parse_args()
+    if args.save and args.only:
+        parser.error("--save records every scenario, drop --only")
+
+    storage = FakeStorage()
+    upload_service.storage = media_cache.storage = create_storage_backend(storage.transport())
+    storage.objects[f"{upload_service.storage.bucket}/{MEDIA_OBJECT}"] = (AUDIO, "audio/mpeg", len(AUDIO))
+    admin = {"Authorization": f"Bearer {create_access_token({'role': 'admin'})}"}
+
+    ids = seed_catalog(tests=args.tests, words=1000)
+    selected = scenarios(ids)
+    if args.only:
+        names = [name.strip() for name in args.only.split(",") if name.strip()]
+        unknown = [name for name in names if name not in selected]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)}. Choose from: {', '.join(selected)}")
+        selected = {name: selected[name] for name in names}
+
+    settings = {"concurrency": args.concurrency, "requests": args.requests, "repeat": args.repeat, "tests": args.tests, "latency": args.latency,
+                "database": os.environ["DATABASE_URL"].split(":", 1)[0]}
+    baseline = {}
+    baseline_peak_rss = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored["settings"] == settings:
+            baseline = stored["results"]
+            # Only comparable when every scenario runs
+            baseline_peak_rss = None if args.only else stored["peak_rss_mb"]
+        else:
+            print(f"Baseline was recorded with {stored['settings']}, not comparing")
+
+    remove = simulate_db_latency(args.latency) if args.latency else None
+    results = {}
+    failed = []
+    try:
+        print(f"{'scenario':>16} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>8}  status")
+        for concurrency in args.concurrency:
+            for name, (paths, needs_admin) in selected.items():
+                key = f"{name} c={concurrency}"
+                headers = admin if needs_admin else None
+                result = best([asyncio.run(drive(paths, concurrency, args.requests, headers=headers))
+                               for _ in range(args.repeat)])
+                results[key] = {metric: round(result[metric], 3) for metric in
+                                ("throughput", "p50_ms", "p95_ms", "p99_ms", "rss_mb")}
+                notes = []
+                if errors(result):
+                    notes.append(f"errors {result['statuses']}")
+                if key in baseline:
+                    notes += compare(result, baseline[key], args.tolerance, args.min_delta_ms)
+                if notes:
+                    failed.append(key)
+                print(f"{key:>16} {result['throughput']:>10.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                      f"{result['p99_ms']:>8.1f} {result['rss_mb']:>8.1f}  {'; '.join(notes) or 'ok'}")
+    finally:
+        if remove:
+            remove()
+
+    peak_rss = peak_rss_mb()
+    print(f"Peak RSS {peak_rss:.1f} MB")
+    if baseline_peak_rss is not None:
+        note = worse("peak RSS MB", baseline_peak_rss, peak_rss, 1, args.tolerance)
+        if note:
+            print(note)
+            failed.append("peak RSS")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "settings": settings,
+                "peak_rss_mb": round(peak_rss, 1),
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    if failed:
+        print(f"Regressions or errors in: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Worker boot time: importing app.main, running the lifespan and the first request.
+
+Each run is a fresh interpreter. The legacy row also runs create_all after
+the import, the way app.main used to on every boot. Every SQL statement
+sleeps for --latency seconds to stand in for a Postgres round trip.
+
+    python -m benchmarks.startup --latency 0.02 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import benchmarks.common  # noqa: F401  (sets up the benchmark database)
+from tests.catalog import seed_catalog
+
+CHILD = """
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+import httpx
+from sqlalchemy import event
+from app.database import Base, engine
+from app.main import app
+
+latency, legacy = float(sys.argv[1]), sys.argv[2] == "legacy"
+event.listen(engine, "before_cursor_execute", lambda *args: time.sleep(latency))
+
+schema = 0.0
+if legacy:
+    before = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    schema = time.perf_counter() - before
+
+
+async def boot():
+    transport = httpx.ASGITransport(app=app)
+    before = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/tests/?limit=1")
+            assert response.status_code == 200, response.text
+        first = time.perf_counter()
+    return ready - before, first - ready
+
+lifespan, first_request = asyncio.run(boot())
+print(json.dumps({
+    "import": imported - started,
+    "schema": schema,
+    "lifespan": lifespan,
+    "first_request": first_request,
+}))
+"""
+
+COLUMNS = ("import", "schema", "lifespan", "first_request")
+
+
+def run_child(latency: float, mode: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, str(latency), mode],
+        env=os.environ, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    seed_catalog(tests=1, words=50)
+
+    print(f"{'boot':>8} " + " ".join(f"{column + ' ms':>18}" for column in COLUMNS) + f" {'total ms':>10}")
+    for mode in ("legacy", "lazy"):
+        runs = [run_child(args.latency, mode) for _ in range(args.runs)]
+        medians = {column: statistics.median(run[column] for run in runs) * 1000 for column in COLUMNS}
+        print(f"{mode:>8} " + " ".join(f"{medians[column]:>18.1f}" for column in COLUMNS)
+              + f" {sum(medians.values()):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
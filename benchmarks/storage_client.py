@@ -0,0 +1,98 @@
+"""Upload throughput and latency of the async storage client, fully offline.
+
+A fake Supabase Storage server runs on a local port with --latency seconds
+per request. The legacy row makes the same uploads with a blocking client
+called from the event loop, the way UploadService used to, so every upload
+waits for the previous one.
+
+    python -m benchmarks.storage_client --uploads 200 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from app.services.storage import SupabaseStorageBackend
+from benchmarks.fake_storage import FakeStorage
+
+
+async def run_async(url: str, path: str, size: int, uploads: int, concurrency: int) -> dict:
+    client = SupabaseStorageBackend(url, key="bench", bucket="uploads", max_concurrency=concurrency, backoff_base=0.01)
+    latencies = []
+
+    async def worker(w: int):
+        for n in range(w, uploads, concurrency):
+            started = time.perf_counter()
+            await client.upload(f"bench/{concurrency}-{n}.mp3", path, "audio/mpeg", size)
+            latencies.append(time.perf_counter() - started)
+
+    await client.ensure_bucket()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    latencies.sort()
+    return {
+        "throughput": uploads / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "retries": client.retries,
+    }
+
+
+async def run_blocking(url: str, path: str, uploads: int, concurrency: int) -> dict:
+    latencies = []
+
+    async def one(client: httpx.Client, n: int):
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            client.post(f"/storage/v1/object/uploads/legacy/{n}.mp3", content=f.read())
+        latencies.append(time.perf_counter() - started)
+
+    with httpx.Client(base_url=url) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, n) for n in range(uploads)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "throughput": uploads / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "retries": 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    url = FakeStorage(latency=args.latency, failure_rate=args.failure_rate, keep_bytes=False).serve()
+    fd, path = tempfile.mkstemp(suffix=".mp3")
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(args.size_kb * 1024))
+    size = args.size_kb * 1024
+
+    try:
+        print(f"{'client':>8} {'in-flight':>10} {'uploads/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'retries':>8}")
+        result = asyncio.run(run_blocking(url, path, min(args.uploads, 50), max(args.concurrency)))
+        print(f"{'legacy':>8} {max(args.concurrency):>10} {result['throughput']:>10.1f} "
+              f"{result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['retries']:>8}")
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_async(url, path, size, args.uploads, concurrency))
+            print(f"{'async':>8} {concurrency:>10} {result['throughput']:>10.1f} "
+                  f"{result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['retries']:>8}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Peak Python heap use of UploadService.upload_file for large audio uploads.
+
+Storage is the in-process fake from benchmarks/fake_storage.py, which drains
+the request body in chunks, so only the upload path itself is measured. The legacy row reads the
+whole file into memory the way the service used to.
+
+    python -m benchmarks.upload_memory --size-mb 20 --concurrency 4
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.services.storage import create_storage_backend
+from app.services.upload import upload_service
+from benchmarks.fake_storage import FakeStorage
+
+
+def drain(stream):
+    while stream.read(64 * 1024):
+        pass
+
+
+def make_audio(size_mb: int) -> str:
+    fd, path = tempfile.mkstemp(suffix=".mp3")
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"ID3\x04\x00\x00\x00\x00\x00\x00")
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            f.write(chunk)
+    return path
+
+
+def open_upload(path: str) -> UploadFile:
+    return UploadFile(
+        open(path, "rb"),
+        size=os.path.getsize(path),
+        filename="recording.mp3",
+        headers=Headers({"content-type": "audio/mpeg"}),
+    )
+
+
+async def streaming(path: str):
+    upload = open_upload(path)
+    try:
+        await upload_service.upload_file(upload, file_type="audio", folder="audio")
+    finally:
+        upload.file.close()
+
+
+async def legacy_buffered(path: str):
+    upload = open_upload(path)
+    try:
+        content = upload.file.read()
+        upload.file.seek(0)
+        content_again = await upload.read()
+        drain(io.BytesIO(content_again))
+        del content, content_again
+    finally:
+        upload.file.close()
+
+
+async def measure(upload, path: str, concurrency: int) -> float:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    await asyncio.gather(*(upload(path) for _ in range(concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=19)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = "supabase"
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    upload_service.storage = create_storage_backend(FakeStorage(keep_bytes=False).transport())
+    path = make_audio(args.size_mb)
+    try:
+        print(f"{args.concurrency} concurrent uploads of {args.size_mb} MB")
+        print(f"{'path':>10} {'peak MB':>10}")
+        for label, upload in (("legacy", legacy_buffered), ("streaming", streaming)):
+            peak = asyncio.run(measure(upload, path, args.concurrency))
+            print(f"{label:>10} {peak:>10.2f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
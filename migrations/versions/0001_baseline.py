@@ -0,0 +1,78 @@
+"""Tests and their four sections
+
+The schema create_all built before migrations were introduced. A database
+created that way is marked as being at this revision with
+`alembic stamp 0001` and then upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ielts_tests",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("image", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_ielts_tests_id", "ielts_tests", ["id"])
+
+    op.create_table(
+        "ielts_listening",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("test_id", sa.Integer(), sa.ForeignKey("ielts_tests.id"), nullable=False),
+        *(sa.Column(f"text{i}", sa.Text(), nullable=False) for i in range(1, 5)),
+        *(sa.Column(f"audio_url{i}", sa.String(), nullable=False) for i in range(1, 5)),
+        *(sa.Column(f"answer_sheet{i}", sa.JSON(), nullable=False) for i in range(1, 5)),
+    )
+    op.create_index("ix_ielts_listening_id", "ielts_listening", ["id"])
+
+    op.create_table(
+        "ielts_reading",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("test_id", sa.Integer(), sa.ForeignKey("ielts_tests.id"), nullable=False),
+        *(sa.Column(f"text{i}", sa.Text(), nullable=False) for i in range(1, 5)),
+        *(sa.Column(f"answer_sheet{i}", sa.JSON(), nullable=False) for i in range(1, 5)),
+    )
+    op.create_index("ix_ielts_reading_id", "ielts_reading", ["id"])
+
+    op.create_table(
+        "ielts_speaking",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("test_id", sa.Integer(), sa.ForeignKey("ielts_tests.id"), nullable=False),
+        sa.Column("questions", sa.JSON(), nullable=False),
+        sa.Column("instruction_ai", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_ielts_speaking_id", "ielts_speaking", ["id"])
+    op.create_index("ix_ielts_speaking_test_id", "ielts_speaking", ["test_id"])
+
+    op.create_table(
+        "ielts_writing",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("test_id", sa.Integer(), sa.ForeignKey("ielts_tests.id"), nullable=False),
+        sa.Column("task_1_text", sa.Text(), nullable=False),
+        sa.Column("task_2_text", sa.Text(), nullable=False),
+        sa.Column("task_1_image_url", sa.String(), nullable=True),
+        sa.Column("task_2_image_url", sa.String(), nullable=True),
+        sa.Column("task_1_instruction", sa.Text(), nullable=False),
+        sa.Column("task_2_instruction", sa.Text(), nullable=False),
+        sa.Column("task_1_ai_prompt", sa.Text(), nullable=False),
+        sa.Column("task_2_ai_prompt", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_ielts_writing_id", "ielts_writing", ["id"])
+
+
+def downgrade():
+    for table in ("ielts_writing", "ielts_speaking", "ielts_reading", "ielts_listening", "ielts_tests"):
+        op.drop_table(table)
@@ -0,0 +1,93 @@
+"""Attempts, revoked tokens, image variants and search vectors
+
+Everything create_all would have added since the baseline. Each step is
+skipped if it is already there, since create_all created new tables on
+databases that existed before them (but never added columns).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SEARCH_CONFIG = "english"
+# Must match SEARCH_SECTIONS in app/services/search.py
+SEARCH_COLUMNS = {
+    "ielts_reading": ["text1", "text2", "text3", "text4"],
+    "ielts_listening": ["text1", "text2", "text3", "text4"],
+    "ielts_writing": ["task_1_text", "task_2_text"],
+}
+VARIANT_COLUMNS = {
+    "ielts_tests": ["image_variants"],
+    "ielts_writing": ["task_1_image_variants", "task_2_image_variants"],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "ielts_attempts" not in tables:
+        op.create_table(
+            "ielts_attempts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("test_id", sa.Integer(), sa.ForeignKey("ielts_tests.id"), nullable=False),
+            sa.Column("section", sa.String(), nullable=False),
+            sa.Column("section_id", sa.Integer(), nullable=False),
+            sa.Column("student_id", sa.String(), nullable=False),
+            sa.Column("answers", sa.JSON(), nullable=False),
+            sa.Column("correct", sa.Integer(), nullable=False),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("band", sa.Float(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_ielts_attempts_id", "ielts_attempts", ["id"])
+        op.create_index("ix_ielts_attempts_test_id", "ielts_attempts", ["test_id"])
+        op.create_index("ix_ielts_attempts_student_id", "ielts_attempts", ["student_id"])
+
+    if "ielts_revoked_tokens" not in tables:
+        op.create_table(
+            "ielts_revoked_tokens",
+            sa.Column("jti", sa.String(), primary_key=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_ielts_revoked_tokens_expires_at", "ielts_revoked_tokens", ["expires_at"])
+
+    for table, columns in VARIANT_COLUMNS.items():
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column not in existing:
+                op.add_column(table, sa.Column(column, sa.JSON(), nullable=True))
+
+    # Full-text search uses generated tsvector columns with GIN indexes on
+    # Postgres; other databases are searched in memory
+    if op.get_bind().dialect.name == "postgresql":
+        for table, columns in SEARCH_COLUMNS.items():
+            document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', {document})) STORED"
+            )
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for table in SEARCH_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+    for table, columns in VARIANT_COLUMNS.items():
+        for column in columns:
+            op.drop_column(table, column)
+    op.drop_table("ielts_revoked_tokens")
+    op.drop_table("ielts_attempts")
@@ -0,0 +1,48 @@
+"""Delete attempts along with their test
+
+0002 (and create_all before it) created ielts_attempts.test_id without
+ON DELETE, so a test with attempts could not be deleted. SQLite cannot
+alter a constraint, so there the table is copied in batch mode.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Postgres's default name for the constraint 0002 created
+FOREIGN_KEY = "ielts_attempts_test_id_fkey"
+NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def _test_id_foreign_key():
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys("ielts_attempts"):
+        if foreign_key["constrained_columns"] == ["test_id"]:
+            return foreign_key
+    return None
+
+
+def _replace(ondelete):
+    foreign_key = _test_id_foreign_key()
+    if foreign_key is not None and (foreign_key["options"].get("ondelete") or "").upper() == (ondelete or ""):
+        return
+    # The naming convention names the unnamed constraint SQLite reflects
+    with op.batch_alter_table("ielts_attempts", naming_convention=NAMING_CONVENTION) as batch_op:
+        if foreign_key is not None:
+            batch_op.drop_constraint(foreign_key["name"] or FOREIGN_KEY, type_="foreignkey")
+        batch_op.create_foreign_key(FOREIGN_KEY, "ielts_tests", ["test_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    _replace("CASCADE")
+
+
+def downgrade():
+    _replace(None)
@@ -0,0 +1,23 @@
+# Most statements each endpoint may run on a cache miss. Keep these tight:
+# raising one should be a decision, not a way to make a test pass.
+QUERY_BUDGETS = {
+    "GET /tests/": 1,
+    "GET /tests/{test_id}": 1,
+    "GET /tests/{test_id}/full": 1,
+    "GET /reading/": 1,
+    "GET /reading/test/{test_id}": 1,
+    "GET /reading/{reading_id}": 1,
+    "GET /reading/{reading_id}/answers": 1,
+    "GET /listening/": 1,
+    "GET /listening/test/{test_id}": 1,
+    "GET /listening/{listening_id}": 1,
+    "GET /listening/{listening_id}/answers": 1,
+    "GET /writing/": 1,
+    "GET /writing/test/{test_id}": 1,
+    "GET /writing/{writing_id}": 1,
+    "GET /speaking/": 1,
+    "GET /speaking/test/{test_id}": 1,
+    "GET /speaking/{speaking_id}": 1,
+    "GET /attempts/": 1,
+    "GET /search/": 3,
+}
@@ -0,0 +1,72 @@
+"""Database setup and a sample catalog, shared by the tests and the benchmarks."""
+import os
+
+from alembic import command
+from alembic.config import Config
+
+from app.database import SessionLocal
+from app.models.listening import Listening
+from app.models.reading import Reading
+from app.models.speaking import Speaking
+from app.models.test import Test
+from app.models.writing import Writing
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+WORDS = (
+    "climate ocean university research library museum history technology "
+    "language culture population economy transport energy science health"
+).split()
+
+
+def migrate():
+    """Upgrade the configured database to the latest migration."""
+    command.upgrade(Config(ALEMBIC_INI), "head")
+
+
+def passage(words: int = 1000, seed: int = 0) -> str:
+    return " ".join(WORDS[(seed + i * 7) % len(WORDS)] for i in range(words))
+
+
+def answer_sheet(seed: int = 0) -> dict:
+    return {i: ["A", "TRUE", "NOT GIVEN", "London"][(seed + i) % 4] for i in range(1, 11)}
+
+
+def seed_catalog(tests: int = 20, words: int = 1000) -> list:
+    db = SessionLocal()
+    try:
+        ids = []
+        for n in range(tests):
+            test = Test(title=f"Practice Test {n + 1}", description=passage(40, n))
+            db.add(test)
+            db.flush()
+            db.add(Reading(
+                test_id=test.id,
+                **{f"text{i}": passage(words, n + i) for i in range(1, 5)},
+                **{f"answer_sheet{i}": answer_sheet(n + i) for i in range(1, 5)},
+            ))
+            db.add(Listening(
+                test_id=test.id,
+                **{f"text{i}": passage(words, n + i) for i in range(1, 5)},
+                **{f"audio_url{i}": f"audio/{n}-{i}.mp3" for i in range(1, 5)},
+                **{f"answer_sheet{i}": answer_sheet(n + i) for i in range(1, 5)},
+            ))
+            db.add(Writing(
+                test_id=test.id,
+                task_1_text=passage(150, n),
+                task_2_text=passage(250, n),
+                task_1_instruction="Summarise the information.",
+                task_2_instruction="Discuss both views.",
+                task_1_ai_prompt="Grade task 1.",
+                task_2_ai_prompt="Grade task 2.",
+            ))
+            db.add(Speaking(
+                test_id=test.id,
+                questions=["Tell me about your hometown", "Describe your favorite hobby"],
+                instruction_ai="Act as an IELTS examiner.",
+            ))
+            ids.append(test.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
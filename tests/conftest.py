@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+# Settings are read when the app is imported, so they are set first. Tests
+# never touch the configured database: they use a throwaway SQLite one
+# unless TEST_DATABASE_URL points at an empty database.
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="ieltsly-test-"), "test.db"
+)
+os.environ["MEDIA_CACHE_DIR"] = tempfile.mkdtemp(prefix="ieltsly-test-media-")
+# Tests that need storage swap in a fake with the `storage` fixture
+os.environ["STORAGE_BACKEND"] = "supabase"
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+# Tests make many requests from one client
+os.environ["RATE_LIMIT_RPS"] = "0"
+os.environ["ROUTE_CONCURRENCY_LIMIT"] = "0"
+os.environ["ADMISSION_MAX_POOL_WAITERS"] = "0"
+
+from contextlib import contextmanager
+from typing import Union
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_storage import FakeStorage
+
+from app.auth import create_access_token
+from app.main import app
+from app.query_log import record_queries
+from app.services.media import media_cache
+from app.services.storage import create_storage_backend
+from app.services.upload import upload_service
+
+from tests.budgets import QUERY_BUDGETS
+from tests.catalog import migrate, seed_catalog
+
+# The test database starts empty
+migrate()
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    """Ids of seeded tests. Each has one section of every kind, with the same id as the test."""
+    return seed_catalog(tests=3, words=200)
+
+
+@pytest.fixture(scope="session")
+def client(catalog):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers():
+    return {"Authorization": f"Bearer {create_access_token({'role': 'admin'})}"}
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """An in-process fake of Supabase Storage behind the upload service and media cache."""
+    fake = FakeStorage()
+    backend = create_storage_backend(fake.transport())
+    monkeypatch.setattr(upload_service, "storage", backend)
+    monkeypatch.setattr(media_cache, "storage", backend)
+    yield fake
+    media_cache.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Fail the test when a block runs more SQL statements than its budget,
+    or runs the same statement shape N_PLUS_ONE_THRESHOLD times:
+
+        def test_full_test(client, query_budget):
+            with query_budget("GET /tests/{test_id}/full"):
+                client.get("/tests/1/full")
+
+    The budget is an endpoint from QUERY_BUDGETS or a number.
+    """
+
+    @contextmanager
+    def budget(limit: Union[str, int], allow_repeats: bool = False):
+        max_queries = QUERY_BUDGETS[limit] if isinstance(limit, str) else limit
+        name = limit if isinstance(limit, str) else "block"
+        with record_queries() as recorder:
+            yield recorder
+        if recorder.count > max_queries:
+            pytest.fail(f"{name}: {recorder.count} queries, budget is {max_queries}\n{recorder.report()}")
+        repeated = recorder.repeated()
+        if repeated and not allow_repeats:
+            shapes = "\n".join(f"  {count}x {shape}" for shape, count in repeated)
+            pytest.fail(f"{name}: N+1 candidates\n{shapes}\n{recorder.report()}")
+
+    return budget
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from app.admission import OTHER_ROUTE, AdmissionController
+from app.auth import create_access_token
+
+
+def scope(token: Optional[str] = None, client: str = "203.0.113.7") -> dict:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return {"type": "http", "headers": headers, "client": (client, 50000)}
+
+
+def controller() -> AdmissionController:
+    return AdmissionController(
+        rate=10, burst=20, max_clients=100, route_limit=0, route_limits={}, max_pool_waiters=0,
+        segments=("tests", "reading"),
+    )
+
+
+def test_verified_token_has_a_bucket_of_its_own():
+    token = create_access_token({"role": "admin"})
+    key = controller().client_key(scope(token))
+
+    assert key.startswith("token:")
+    assert token not in key
+    assert controller().client_key(scope(token, client="198.51.100.1")) == key
+
+
+def test_made_up_token_shares_its_ip_bucket():
+    assert controller().client_key(scope("made-up")) == "ip:203.0.113.7"
+    assert controller().client_key(scope("another")) == "ip:203.0.113.7"
+
+
+def test_new_token_per_request_does_not_dodge_the_rate_limit():
+    admission = controller()
+    decisions = [
+        admission.admit({**scope(f"made-up-{n}"), "method": "GET", "path": "/tests/"}) for n in range(21)
+    ]
+
+    # The burst of 20 is spent, whatever the token
+    assert decisions[:20] == [None] * 20
+    assert decisions[20][0] == 429
+
+
+def test_unknown_paths_share_one_route():
+    admission = controller()
+    for path in ("/tests/", "/tests/5", "/abc123", "/xyz/1", "/"):
+        admission.admit({**scope(), "method": "GET", "path": path})
+    admission.admit({**scope(), "method": "BREW", "path": "/tests/"})
+
+    assert set(admission.by_route) == {"GET /tests", OTHER_ROUTE}
+    assert admission.by_route[OTHER_ROUTE]["admitted"] == 4
+
+
+def test_app_routes_are_known(client):
+    from app.admission import admission_controller
+
+    assert {"tests", "reading", "media", "upload"} <= admission_controller.segments
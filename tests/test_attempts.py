@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import delete, func, insert, select
+
+from app.database import SessionLocal, engine
+from app.models.attempt import Attempt
+from app.models.test import Test as PracticeTest  # pytest would collect a class named Test*
+from app.services.attempts import AttemptWriter
+
+
+def attempt(test_id, student_id):
+    return {
+        "test_id": test_id,
+        "section": "reading",
+        "section_id": test_id,
+        "student_id": student_id,
+        "answers": {},
+        "correct": 0,
+        "total": 40,
+        "band": 0.0,
+    }
+
+
+def attempts_of(student_id) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Attempt).where(Attempt.student_id == student_id))
+
+
+@pytest.fixture
+def writer():
+    # Only flushed by the tests
+    writer = AttemptWriter(
+        mode="async", flush_size=1000, flush_interval=60, max_pending=1000, max_queued=3, max_retries=2
+    )
+    writer.start()
+    yield writer
+    writer.stop()
+
+
+def test_rejected_row_does_not_hold_up_the_batch(catalog, writer):
+    bad = attempt(catalog[0], None)
+    writer.add_many([attempt(catalog[0], "writer-batch"), bad, attempt(catalog[0], "writer-batch")])
+
+    assert writer.flush() == 2
+    assert attempts_of("writer-batch") == 2
+    assert writer.stats()["pending"] == 1
+
+    # Dropped after max_retries rejections
+    writer.flush()
+    assert writer.stats()["pending"] == 0
+    assert writer.rejected == 2
+    assert writer.dropped == 1
+
+
+def test_queue_is_capped(catalog, writer):
+    writer.add_many([attempt(catalog[0], "writer-cap") for _ in range(5)])
+
+    assert writer.stats()["pending"] == 3
+    assert writer.dropped == 2
+    writer.flush()
+    assert attempts_of("writer-cap") == 3
+
+
+def test_attempts_are_deleted_with_their_test():
+    with engine.connect() as conn:
+        # SQLite only enforces foreign keys when asked to, per connection
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.commit()
+        try:
+            with conn.begin():
+                test_id = conn.execute(
+                    insert(PracticeTest).values(title="Deleted test", description="").returning(PracticeTest.id)
+                ).scalar_one()
+                conn.execute(insert(Attempt).values(created_at=func.now(), **attempt(test_id, "writer-cascade")))
+                conn.execute(delete(PracticeTest).where(PracticeTest.id == test_id))
+        finally:
+            if sqlite:
+                conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+                conn.commit()
+    assert attempts_of("writer-cascade") == 0
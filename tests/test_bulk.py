@@ -0,0 +1,74 @@
+import gzip
+import json
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+
+def speaking(question: str) -> dict:
+    return {"questions": [question], "instruction_ai": "Act as an IELTS examiner."}
+
+
+def export(client, headers, **params):
+    response = client.get("/bulk/tests/export", headers=headers, params=params)
+    assert response.status_code == 200
+    return response
+
+
+def exported(body: bytes, test_id: int) -> dict:
+    return next(record for record in map(json.loads, body.splitlines()) if record["id"] == test_id)
+
+
+def test_export_keeps_every_section_row(client, admin_headers):
+    record = {
+        "title": "Three speaking parts",
+        "description": "Imported",
+        "speaking": speaking("Part 1"),
+        "extra_sections": {"speaking": [speaking("Part 2"), speaking("Part 3")]},
+    }
+    result = client.post("/bulk/tests/import", headers=admin_headers, content=json.dumps(record)).json()
+    assert result["failed"] == 0
+    test_id = result["test_ids"][0]
+
+    line = exported(export(client, admin_headers).content, test_id)
+
+    assert line["speaking"]["questions"] == ["Part 1"]
+    assert [row["questions"] for row in line["extra_sections"]["speaking"]] == [["Part 2"], ["Part 3"]]
+
+    # The export is accepted back by the import
+    result = client.post("/bulk/tests/import", headers=admin_headers, content=json.dumps(line)).json()
+    copy = exported(export(client, admin_headers).content, result["test_ids"][0])
+    assert [row["questions"] for row in copy["extra_sections"]["speaking"]] == [["Part 2"], ["Part 3"]]
+
+
+def test_gzip_export_is_a_gzip_file(client, catalog, admin_headers):
+    response = export(client, admin_headers, gzip="true")
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in response.headers
+    assert 'filename="tests.ndjson.gz"' in response.headers["content-disposition"]
+    # Nothing decoded it on the way
+    assert exported(gzip.decompress(response.content), catalog[0])["title"]
+
+
+def test_failed_commit_does_not_report_rolled_back_ids(client, admin_headers, monkeypatch):
+    commit = Session.commit
+    calls = []
+
+    def commit_failing_once(self):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("COMMIT", {}, Exception("connection lost"))
+        return commit(self)
+
+    monkeypatch.setattr(Session, "commit", commit_failing_once)
+    records = [{"title": f"Retried {n}", "description": "Imported"} for n in range(3)]
+    body = "\n".join(json.dumps(record) for record in records)
+
+    result = client.post("/bulk/tests/import", headers=admin_headers, content=body).json()
+
+    assert result["imported"] == 3
+    assert len(result["test_ids"]) == 3
+    monkeypatch.undo()
+    body = export(client, admin_headers).content
+    assert [exported(body, test_id)["title"] for test_id in result["test_ids"]] == [r["title"] for r in records]
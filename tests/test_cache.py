@@ -0,0 +1,45 @@
+from app.models.speaking import SpeakingResponse
+from app.services.cache import ContentCache
+
+KEY = ("tests", "id", 1)
+
+
+def cache() -> ContentCache:
+    return ContentCache(max_entries=10, max_bytes=1024 * 1024, ttl_seconds=60)
+
+
+def body(question: str) -> SpeakingResponse:
+    return SpeakingResponse(id=1, test_id=1, questions=[question], instruction_ai="")
+
+
+def test_miss_is_cached():
+    content = cache()
+    generation = content.generation(KEY)
+    content.put(KEY, body("Loaded"), generation)
+
+    assert b"Loaded" in content.get(KEY).body
+
+
+def test_value_loaded_before_a_write_is_not_cached():
+    content = cache()
+    generation = content.generation(KEY)
+    # A write commits and invalidates while the miss is loading
+    content.invalidate(KEY)
+    served = content.put(KEY, body("Old"), generation)
+
+    assert b"Old" in served.body
+    assert content.get(KEY) is None
+    assert content.stats()["stale_puts"] == 1
+
+    content.put(KEY, body("New"), content.generation(KEY))
+    assert b"New" in content.get(KEY).body
+
+
+def test_test_invalidation_covers_its_full_view():
+    content = cache()
+    full = ("tests", "full", 1)
+    generation = content.generation(full)
+    content.invalidate_test(1)
+    content.put(full, body("Old"), generation)
+
+    assert content.get(full) is None
@@ -0,0 +1,59 @@
+import pytest
+
+from app.services.grading import CompiledKey
+
+
+def is_correct(key: str, answer: str) -> bool:
+    compiled = CompiledKey("reading", [{"1": key}])
+    return compiled.grade({1: {1: answer}})["parts"][0]["results"][1]
+
+
+@pytest.mark.parametrize("key, answer", [
+    ("TRUE", "t"),
+    ("False", "F"),
+    ("YES", "y"),
+    ("no", "N"),
+    ("NOT GIVEN", "ng"),
+    ("Not Given", "not-given"),
+    ("NG", "Not given"),
+])
+def test_judgement_answers_accept_short_forms(key, answer):
+    assert is_correct(key, answer)
+
+
+@pytest.mark.parametrize("key, answer", [
+    # Letters of matching questions are not judgements
+    ("F", "false"),
+    ("T", "true"),
+    ("Y", "yes"),
+    ("N", "no"),
+    ("N", "not given"),
+])
+def test_letter_answers_are_not_rewritten(key, answer):
+    assert not is_correct(key, answer)
+    assert is_correct(key, key.lower())
+
+
+def test_anyone_may_grade_without_recording(client, catalog):
+    response = client.post(f"/reading/{catalog[0]}/grade", json={"answers": {1: {1: "A"}}})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("section", ["reading", "listening"])
+def test_recording_an_attempt_needs_a_token(client, catalog, admin_headers, section):
+    body = {"student_id": "someone-else", "answers": {1: {1: "A"}}}
+
+    assert client.post(f"/{section}/{catalog[0]}/grade", json=body).status_code == 401
+    assert client.post(f"/{section}/{catalog[0]}/grade", json=body, headers=admin_headers).status_code == 200
+    forged = {"Authorization": "Bearer made-up"}
+    assert client.post(f"/{section}/{catalog[0]}/grade", json=body, headers=forged).status_code == 401
+
+
+@pytest.mark.parametrize("section", ["reading", "listening"])
+def test_batch_grading_is_admin_only(client, catalog, admin_headers, section):
+    body = {"submissions": [{"answers": {1: {1: "A"}}}]}
+
+    assert client.post(f"/{section}/{catalog[0]}/grade/batch", json=body).status_code == 401
+    response = client.post(f"/{section}/{catalog[0]}/grade/batch", json=body, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.text.count("\n") == 1
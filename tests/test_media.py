@@ -0,0 +1,48 @@
+import os
+import time
+
+from app.services.media import MEDIA_PARTIAL_MAX_AGE, MediaCache, media_cache
+from app.services.storage import StorageError
+from app.services.upload import upload_service
+
+AUDIO = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes(range(256)) * 4
+
+
+def put(storage, path: str, body: bytes = AUDIO):
+    storage.objects[f"{upload_service.storage.bucket}/{path}"] = (body, "audio/mpeg", len(body))
+
+
+def test_load_indexes_files_and_only_removes_stale_partials(tmp_path):
+    (tmp_path / "audio").mkdir()
+    (tmp_path / "audio" / "kept.mp3").write_bytes(AUDIO)
+    fresh = tmp_path / "audio" / ".partial-fresh"
+    stale = tmp_path / "audio" / ".partial-stale"
+    fresh.write_bytes(b"still downloading")
+    stale.write_bytes(b"left by a crash")
+    old = time.time() - MEDIA_PARTIAL_MAX_AGE - 60
+    os.utime(stale, (old, old))
+
+    cache = MediaCache(storage=None, directory=str(tmp_path), max_bytes=10 * 1024 * 1024)
+    cache.load()
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == len(AUDIO)
+    assert fresh.exists()
+    assert not stale.exists()
+
+
+def test_deleted_file_is_not_served_from_the_cache(client, admin_headers, storage):
+    put(storage, "audio/deleted.mp3")
+    assert client.get("/media/audio/deleted.mp3").content == AUDIO
+
+    response = client.delete("/upload/file/audio/deleted.mp3", headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/media/audio/deleted.mp3").status_code == 404
+
+
+def test_path_refused_by_the_backend_is_not_found(client, monkeypatch):
+    async def refuse(object_path):
+        raise StorageError("Path leaves the storage root", status_code=400)
+
+    monkeypatch.setattr(media_cache, "get", refuse)
+    assert client.get("/media/audio/refused.mp3").status_code == 404
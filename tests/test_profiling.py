@@ -0,0 +1,32 @@
+import anyio.to_thread
+import pytest
+
+from app.profiling import _wants_profile
+
+
+@pytest.mark.parametrize("query, wanted", [
+    (b"profile=1", True),
+    (b"limit=5&profile=1", True),
+    (b"noprofile=1", False),
+    (b"xprofile=1", False),
+    (b"profile=10", False),
+    (b"profile=0", False),
+])
+def test_profile_switch_is_a_query_parameter(query, wanted):
+    assert _wants_profile({"query_string": query, "headers": []}) is wanted
+
+
+def test_profiled_request_includes_its_worker_thread(client, admin_headers):
+    run_sync = anyio.to_thread.run_sync
+    response = client.get("/reading/?profile=1", headers=admin_headers)
+    assert response.status_code == 200
+    assert anyio.to_thread.run_sync is run_sync
+
+    report = client.get(f"/internal/profiles/{response.headers['X-Profile-Id']}", headers=admin_headers).json()
+    # The event loop thread and the thread the sync endpoint ran in
+    assert report["threads"] == 2
+    assert report["self_ms"]["database"] > 0
+
+
+def test_profile_needs_an_admin_token(client):
+    assert "X-Profile-Id" not in client.get("/reading/?profile=1").headers
@@ -0,0 +1,41 @@
+import pytest
+
+from app.services.cache import content_cache
+
+from tests.budgets import QUERY_BUDGETS
+
+# A request for every endpoint with a budget; {id} is a seeded test, and
+# its sections have the same id
+REQUESTS = {
+    "GET /tests/": "/tests/",
+    "GET /tests/{test_id}": "/tests/{id}",
+    "GET /tests/{test_id}/full": "/tests/{id}/full",
+    "GET /reading/": "/reading/",
+    "GET /reading/test/{test_id}": "/reading/test/{id}",
+    "GET /reading/{reading_id}": "/reading/{id}",
+    "GET /reading/{reading_id}/answers": "/reading/{id}/answers",
+    "GET /listening/": "/listening/",
+    "GET /listening/test/{test_id}": "/listening/test/{id}",
+    "GET /listening/{listening_id}": "/listening/{id}",
+    "GET /listening/{listening_id}/answers": "/listening/{id}/answers",
+    "GET /writing/": "/writing/",
+    "GET /writing/test/{test_id}": "/writing/test/{id}",
+    "GET /writing/{writing_id}": "/writing/{id}",
+    "GET /speaking/": "/speaking/",
+    "GET /speaking/test/{test_id}": "/speaking/test/{id}",
+    "GET /speaking/{speaking_id}": "/speaking/{id}",
+    "GET /attempts/": "/attempts/",
+    "GET /search/": "/search/?q=climate",
+}
+
+
+def test_every_budget_has_a_request():
+    assert set(REQUESTS) == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("endpoint", sorted(REQUESTS))
+def test_endpoint_stays_within_budget(client, catalog, admin_headers, query_budget, endpoint):
+    content_cache.clear()
+    with query_budget(endpoint):
+        response = client.get(REQUESTS[endpoint].format(id=catalog[0]), headers=admin_headers)
+    assert response.status_code == 200
@@ -0,0 +1,23 @@
+from app.services.search import highlight, tokenize
+
+
+def terms(query: str) -> set:
+    return set(tokenize(query))
+
+
+def test_snippet_starts_a_little_before_the_first_match():
+    text = " ".join(f"w{n}" for n in range(100)) + " Oceans are researched " + " ".join(f"v{n}" for n in range(100))
+
+    snippet = highlight(text, terms("ocean research"), max_words=9)
+
+    assert snippet == "... w97 w98 w99 <mark>Oceans</mark> are <mark>researched</mark> v0 v1 v2 ..."
+
+
+def test_match_inside_a_hyphenated_word():
+    assert highlight("the climate-change debate", terms("change")) == "the <mark>climate-change</mark> debate"
+
+
+def test_longer_words_with_the_term_as_prefix_are_not_matches():
+    snippet = highlight("oceanic views of the ocean", terms("ocean"), max_words=3)
+
+    assert snippet == "... the <mark>ocean</mark>"
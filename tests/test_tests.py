@@ -0,0 +1,33 @@
+import json
+
+from app.services.cache import content_cache
+
+
+def speaking(question: str) -> dict:
+    return {"questions": [question], "instruction_ai": "Act as an IELTS examiner."}
+
+
+def test_full_test_has_the_first_row_of_each_section(client, catalog, admin_headers):
+    record = {
+        "title": "Several speaking rows",
+        "description": "Imported",
+        "speaking": speaking("Part 1"),
+        "extra_sections": {"speaking": [speaking("Part 2"), speaking("Part 3")]},
+    }
+    result = client.post("/bulk/tests/import", headers=admin_headers, content=json.dumps(record)).json()
+    test_id = result["test_ids"][0]
+    content_cache.clear()
+
+    full = client.get(f"/tests/{test_id}/full").json()
+
+    assert full["speaking"] == client.get(f"/speaking/test/{test_id}").json()
+    assert full["speaking"]["questions"] == ["Part 1"]
+    assert full["reading"] is None
+
+
+def test_full_test_of_a_seeded_test(client, catalog):
+    content_cache.clear()
+    full = client.get(f"/tests/{catalog[0]}/full").json()
+
+    for section in ("listening", "reading", "speaking", "writing"):
+        assert full[section] == client.get(f"/{section}/test/{catalog[0]}").json()
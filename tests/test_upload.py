@@ -0,0 +1,50 @@
+import hashlib
+
+from app.services.images import VARIANT_FORMATS, VARIANTS, variant_path
+from app.services.upload import IMAGE_FOLDER, upload_service
+
+
+def put(storage, path: str, body: bytes = b"stored"):
+    storage.objects[f"{upload_service.storage.bucket}/{path}"] = (body, "application/octet-stream", len(body))
+
+
+def stored(storage, path: str) -> bool:
+    return f"{upload_service.storage.bucket}/{path}" in storage.objects
+
+
+def test_file_used_by_a_test_is_not_deleted(client, catalog, admin_headers, storage):
+    # The first seeded test's listening section plays audio/0-1.mp3
+    put(storage, "audio/0-1.mp3")
+
+    response = client.delete("/upload/file/audio/0-1.mp3", headers=admin_headers)
+
+    assert response.status_code == 409
+    assert str(catalog[0]) in response.json()["detail"]
+    assert stored(storage, "audio/0-1.mp3")
+
+
+def test_image_is_deleted_with_its_variants(client, admin_headers, storage):
+    sha256 = hashlib.sha256(b"unused image").hexdigest()
+    original = f"{IMAGE_FOLDER}/{sha256}.png"
+    variants = [variant_path(IMAGE_FOLDER, sha256, variant, fmt) for variant in VARIANTS for fmt in VARIANT_FORMATS]
+    for path in [original, *variants]:
+        put(storage, path)
+
+    response = client.delete(f"/upload/file/{original}", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert not any(stored(storage, path) for path in [original, *variants])
+
+
+def test_audio_upload_is_stored_by_content_hash(client, admin_headers, storage):
+    audio = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes(range(256)) * 64
+    sha256 = hashlib.sha256(audio).hexdigest()
+
+    response = client.post(
+        "/upload/audio", headers=admin_headers, files={"file": ("recording.mp3", audio, "audio/mpeg")}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"]["sha256"] == sha256
+    stored_object = next(body for key, (body, _, _) in storage.objects.items() if sha256 in key)
+    assert stored_object == audio